@@ -1,7 +1,7 @@
 import argparse
 
 from src.i18n import _
-from src.utils import is_admin, _hide_console
+from src.utils import is_admin, lower_process_priority, _hide_console
 
 
 def main() -> None:
@@ -11,6 +11,11 @@ def main() -> None:
         action="store_true",
         help=_("Run backup according to the saved configuration (called from the scheduler)")
     )
+    p.add_argument(
+        "--extract",
+        metavar="DEST",
+        help=_("Extract the packed and compressed files of the target below DEST and exit")
+    )
     p.add_argument(
         "--dev",
         action="store_true",
@@ -19,6 +24,19 @@ def main() -> None:
 
     args = p.parse_args()
 
+    if args.extract:
+        from pathlib import Path
+        from src.config import Settings
+        from src.compress import extract_tree
+        from src.pack import extract
+
+        cfg = Settings.load()
+        if not cfg:
+            raise SystemExit(_("No saved configuration, run GUI first."))
+        root = Path(cfg.target_dir).expanduser().resolve()
+        count = extract(root, Path(args.extract)) + extract_tree(root, Path(args.extract))
+        print(_("Extracted {count} packed and compressed files to {dest}").format(count=count, dest=args.extract))
+        raise SystemExit(0)
     if args.backup:
         from src.config import Settings
         from src.copier import run_backup
@@ -26,6 +44,9 @@ def main() -> None:
         cfg = Settings.load()
         if not cfg:
             raise SystemExit(_("No saved configuration, run GUI first."))
+        cfg = cfg.for_background()
+        if cfg.limits.low_priority:
+            lower_process_priority()
         if not cfg.show_console:
             _hide_console()
         success = False
@@ -0,0 +1,151 @@
+import lzma
+import os
+import shutil
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from src.fastcopy import PARTIAL_SUFFIX
+from src.throttle import Throttle
+
+COMPRESSED_SUFFIX = ".bkz"
+_MAGIC = b"BKZ"
+_HEADER = struct.Struct("<3sBQ")  # magic, codec id, logical size
+_BUF_SIZE = 1024 * 1024
+_SAMPLE_SIZE = 64 * 1024
+_MIN_RATIO = 0.9  # a zlib-1 sample that shrinks less than this is not worth compressing
+
+# extensions of formats that are compressed already
+INCOMPRESSIBLE = frozenset({
+    ".7z", ".apk", ".avi", ".br", ".bz2", ".cab", ".docx", ".epub", ".flac", ".gif", ".gz", ".heic", ".jar",
+    ".jpeg", ".jpg", ".lz4", ".lzma", ".m4a", ".mkv", ".mov", ".mp3", ".mp4", ".odt", ".ogg", ".opus",
+    ".png", ".pptx", ".rar", ".tgz", ".webm", ".webp", ".woff", ".woff2", ".xlsx", ".xz", ".zip", ".zst",
+    COMPRESSED_SUFFIX,
+})
+
+
+class Codec(NamedTuple):
+    id: int
+    compressor: Callable[[], Any]  # objects with compress()/flush()
+    decompressor: Callable[[], Any]  # objects with decompress()
+
+
+def _optional_codecs() -> Dict[str, Codec]:
+    try:
+        import zstandard
+    except ImportError:
+        return {}
+    return {"zstd": Codec(3, lambda: zstandard.ZstdCompressor(level=3).compressobj(),
+                          lambda: zstandard.ZstdDecompressor().decompressobj())}
+
+
+CODECS: Dict[str, Codec] = {
+    "zlib": Codec(1, lambda: zlib.compressobj(6), zlib.decompressobj),
+    "lzma": Codec(2, lambda: lzma.LZMACompressor(preset=1), lzma.LZMADecompressor),
+    **_optional_codecs(),
+}
+_BY_ID = {c.id: c for c in CODECS.values()}
+
+
+def resolve_codec(name: Optional[str]) -> Optional[str]:
+    """
+    Codec to use for a Settings.compression value: None when off, "auto"
+    picks zstd if installed and zlib otherwise.
+
+    Raises:
+        KeyError: if the codec is unknown or its package is not installed.
+    """
+    if not name or name == "none":
+        return None
+    if name == "auto":
+        return "zstd" if "zstd" in CODECS else "zlib"
+    if name not in CODECS:
+        raise KeyError(name)
+    return name
+
+
+def compressible(path: str, name: str) -> bool:
+    """
+    False for known compressed formats and for files whose first block barely shrinks.
+    """
+    if os.path.splitext(name)[1].lower() in INCOMPRESSIBLE:
+        return False
+    with open(path, "rb") as f:
+        sample = f.read(_SAMPLE_SIZE)
+    return len(sample) < 64 or len(zlib.compress(sample, 1)) < len(sample) * _MIN_RATIO
+
+
+def compress_file(src: str, dst: str, codec: str, throttle: Optional[Throttle] = None,
+                  hasher: Any = None) -> int:
+    """
+    Stream src into dst compressed with codec, behind a header naming the codec
+    and the logical size, then copy src's metadata. Written to a temporary
+    file renamed over dst when complete. The uncompressed content is also fed
+    to hasher (an object with update()) when given.
+
+    Returns:
+        Stored size of dst in bytes.
+    """
+    c = CODECS[codec]
+    comp = c.compressor()
+    tmp = dst + PARTIAL_SUFFIX
+    try:
+        with open(src, "rb") as fs, open(tmp, "wb") as fd:
+            fd.write(_HEADER.pack(_MAGIC, c.id, os.fstat(fs.fileno()).st_size))
+            while chunk := fs.read(_BUF_SIZE):
+                if throttle is not None:
+                    throttle.bytes(len(chunk))
+                if hasher is not None:
+                    hasher.update(chunk)
+                fd.write(comp.compress(chunk))
+            fd.write(comp.flush())
+            stored = fd.tell()
+        shutil.copystat(src, tmp, follow_symlinks=False)
+        os.replace(tmp, dst)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return stored
+
+
+def decompress_file(src: str, dst: str) -> int:
+    """
+    Restore a file written by compress_file, with its timestamps.
+
+    Returns:
+        Logical size written.
+    """
+    with open(src, "rb") as fs:
+        magic, codec_id, size = _HEADER.unpack(fs.read(_HEADER.size))
+        if magic != _MAGIC or codec_id not in _BY_ID:
+            raise ValueError(f"{src}: not a compressed backup file or codec not installed")
+        dec = _BY_ID[codec_id].decompressor()
+        with open(dst, "wb") as fd:
+            while chunk := fs.read(_BUF_SIZE):
+                fd.write(dec.decompress(chunk))
+            written = fd.tell()
+    if written != size:
+        raise ValueError(f"{src}: expected {size} bytes, got {written}")
+    shutil.copystat(src, dst, follow_symlinks=False)
+    return written
+
+
+def extract_tree(root: Path, dest: Path) -> int:
+    """
+    Decompress every compressed file below the target root into the same relative place below dest.
+
+    Returns:
+        Number of files written.
+    """
+    count = 0
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            if not name.endswith(COMPRESSED_SUFFIX):
+                continue
+            rel = os.path.relpath(os.path.join(dirpath, name), root)[:-len(COMPRESSED_SUFFIX)]
+            out = dest / rel
+            out.parent.mkdir(parents=True, exist_ok=True)
+            decompress_file(os.path.join(dirpath, name), str(out))
+            count += 1
+    return count
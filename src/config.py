@@ -1,6 +1,6 @@
 import json
 import os
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, asdict, field, replace
 from pathlib import Path
 from typing import Optional, List, Any
 
@@ -11,12 +11,39 @@ CONFIG_FILE = Path(os.getenv("APPDATA", ".")) / "BackupTool" / "config.json"
 class PathRule:
     source: str
     excludes: List[str] = field(default_factory=list)
+    patterns: List[str] = field(default_factory=list)
 
     def __post_init__(self):
         if not isinstance(self.source, str) or not self.source:
             raise ValueError(f"Invalid PathRule.source: {self.source!r}")
         if not isinstance(self.excludes, list) or not all(isinstance(e, str) for e in self.excludes):
             raise ValueError(f"Invalid PathRule.excludes: {self.excludes!r}")
+        if not isinstance(self.patterns, list) or not all(isinstance(p, str) for p in self.patterns):
+            raise ValueError(f"Invalid PathRule.patterns: {self.patterns!r}")
+        negated = [p for p in self.patterns if p.strip().startswith("!")]
+        if negated:
+            raise ValueError(f"Negated PathRule.patterns are not supported: {negated!r}")
+
+
+@dataclass
+class IOLimits:
+    max_copy_workers: int = 0  # 0: lane sizes as configured
+    max_bytes_per_sec: int = 0  # 0: unlimited
+    max_files_per_sec: int = 0  # 0: unlimited
+    low_priority: bool = False  # background CPU/IO priority for the process
+
+    def __post_init__(self):
+        for name in ("max_copy_workers", "max_bytes_per_sec", "max_files_per_sec"):
+            value = getattr(self, name)
+            if not isinstance(value, int) or value < 0:
+                raise ValueError(f"IOLimits.{name} must be a non-negative int, got {value!r}")
+        if not isinstance(self.low_priority, bool):
+            raise ValueError("IOLimits.low_priority must be bool")
+
+
+def _background_limits() -> IOLimits:
+    return IOLimits(max_copy_workers=2, max_bytes_per_sec=20 * 1024 * 1024, max_files_per_sec=500,
+                    low_priority=True)
 
 
 @dataclass
@@ -28,6 +55,30 @@ class Settings:
     show_tray_icon: bool = True
     show_overlay: bool = True
     last_success: Optional[str] = None
+    scan_workers: int = 8
+    hash_algorithm: str = "sha1"
+    hash_workers: int = 4
+    sample_threshold: int = 256 * 1024 * 1024
+    sample_blocks: int = 16
+    full_verify_days: int = 30
+    delta_threshold: int = 64 * 1024 * 1024
+    small_file_workers: int = 8
+    large_file_workers: int = 2
+    large_file_threshold: int = 8 * 1024 * 1024
+    pack_small_files: bool = False
+    pack_threshold: int = 64 * 1024
+    pack_segment_size: int = 64 * 1024 * 1024
+    compression: str = "none"  # none, auto (zstd if installed, else zlib), zstd, zlib or lzma
+    dedup: bool = False
+    dedup_min_size: int = 16 * 1024
+    snapshots: bool = False
+    keep_daily: int = 7
+    keep_weekly: int = 4
+    mirror_sync: bool = False
+    mirror_scan_target: bool = False  # also find orphans the manifest doesn't know by walking the target
+    max_delete_fraction: float = 0.2
+    limits: IOLimits = field(default_factory=IOLimits)
+    background_limits: IOLimits = field(default_factory=_background_limits)
 
     def __post_init__(self):
         if not isinstance(self.target_dir, str):
@@ -44,6 +95,60 @@ class Settings:
             raise ValueError("Settings.show_overlay must be bool")
         if self.last_success is not None and not isinstance(self.last_success, str):
             raise ValueError("Settings.last_success must be str or None")
+        if not isinstance(self.scan_workers, int) or self.scan_workers < 1:
+            raise ValueError("Settings.scan_workers must be a positive int")
+        if not isinstance(self.hash_algorithm, str) or not self.hash_algorithm:
+            raise ValueError("Settings.hash_algorithm must be a non-empty string")
+        if not isinstance(self.hash_workers, int) or self.hash_workers < 1:
+            raise ValueError("Settings.hash_workers must be a positive int")
+        if not isinstance(self.sample_threshold, int) or self.sample_threshold < 0:
+            raise ValueError("Settings.sample_threshold must be a non-negative int")
+        if not isinstance(self.sample_blocks, int) or self.sample_blocks < 0:
+            raise ValueError("Settings.sample_blocks must be a non-negative int")
+        if not isinstance(self.full_verify_days, int) or self.full_verify_days < 0:
+            raise ValueError("Settings.full_verify_days must be a non-negative int")
+        if not isinstance(self.delta_threshold, int) or self.delta_threshold < 0:
+            raise ValueError("Settings.delta_threshold must be a non-negative int")
+        if not isinstance(self.small_file_workers, int) or self.small_file_workers < 1:
+            raise ValueError("Settings.small_file_workers must be a positive int")
+        if not isinstance(self.large_file_workers, int) or self.large_file_workers < 1:
+            raise ValueError("Settings.large_file_workers must be a positive int")
+        if not isinstance(self.large_file_threshold, int) or self.large_file_threshold < 0:
+            raise ValueError("Settings.large_file_threshold must be a non-negative int")
+        if not isinstance(self.pack_small_files, bool):
+            raise ValueError("Settings.pack_small_files must be bool")
+        if not isinstance(self.pack_threshold, int) or self.pack_threshold < 0:
+            raise ValueError("Settings.pack_threshold must be a non-negative int")
+        if not isinstance(self.pack_segment_size, int) or self.pack_segment_size < 1:
+            raise ValueError("Settings.pack_segment_size must be a positive int")
+        if self.compression not in ("none", "auto", "zstd", "zlib", "lzma"):
+            raise ValueError(f"Invalid Settings.compression: {self.compression!r}")
+        if not isinstance(self.dedup, bool):
+            raise ValueError("Settings.dedup must be bool")
+        if not isinstance(self.dedup_min_size, int) or self.dedup_min_size < 0:
+            raise ValueError("Settings.dedup_min_size must be a non-negative int")
+        if not isinstance(self.snapshots, bool):
+            raise ValueError("Settings.snapshots must be bool")
+        if not isinstance(self.keep_daily, int) or self.keep_daily < 0:
+            raise ValueError("Settings.keep_daily must be a non-negative int")
+        if not isinstance(self.keep_weekly, int) or self.keep_weekly < 0:
+            raise ValueError("Settings.keep_weekly must be a non-negative int")
+        if not isinstance(self.mirror_sync, bool):
+            raise ValueError("Settings.mirror_sync must be bool")
+        if not isinstance(self.mirror_scan_target, bool):
+            raise ValueError("Settings.mirror_scan_target must be bool")
+        if not isinstance(self.max_delete_fraction, (int, float)) or not 0 <= self.max_delete_fraction <= 1:
+            raise ValueError("Settings.max_delete_fraction must be between 0 and 1")
+        if not isinstance(self.limits, IOLimits):
+            raise ValueError("Settings.limits must be IOLimits")
+        if not isinstance(self.background_limits, IOLimits):
+            raise ValueError("Settings.background_limits must be IOLimits")
+
+    def for_background(self) -> "Settings":
+        """
+        Copy of these settings running under the background I/O limits (scheduled runs).
+        """
+        return replace(self, limits=self.background_limits)
 
     @classmethod
     def load(cls) -> Optional["Settings"]:
@@ -60,6 +165,31 @@ class Settings:
                 show_tray_icon=data.get("show_tray_icon", True),
                 show_overlay=data.get("show_overlay", True),
                 last_success=data.get("last_success"),
+                scan_workers=data.get("scan_workers", 8),
+                hash_algorithm=data.get("hash_algorithm", "sha1"),
+                hash_workers=data.get("hash_workers", 4),
+                sample_threshold=data.get("sample_threshold", 256 * 1024 * 1024),
+                sample_blocks=data.get("sample_blocks", 16),
+                full_verify_days=data.get("full_verify_days", 30),
+                delta_threshold=data.get("delta_threshold", 64 * 1024 * 1024),
+                small_file_workers=data.get("small_file_workers", 8),
+                large_file_workers=data.get("large_file_workers", 2),
+                large_file_threshold=data.get("large_file_threshold", 8 * 1024 * 1024),
+                pack_small_files=data.get("pack_small_files", False),
+                pack_threshold=data.get("pack_threshold", 64 * 1024),
+                pack_segment_size=data.get("pack_segment_size", 64 * 1024 * 1024),
+                compression=data.get("compression", "none"),
+                dedup=data.get("dedup", False),
+                dedup_min_size=data.get("dedup_min_size", 16 * 1024),
+                snapshots=data.get("snapshots", False),
+                keep_daily=data.get("keep_daily", 7),
+                keep_weekly=data.get("keep_weekly", 4),
+                mirror_sync=data.get("mirror_sync", False),
+                mirror_scan_target=data.get("mirror_scan_target", False),
+                max_delete_fraction=data.get("max_delete_fraction", 0.2),
+                limits=IOLimits(**data.get("limits", {})),
+                background_limits=(IOLimits(**data["background_limits"]) if "background_limits" in data
+                                   else _background_limits()),
             )
         except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
             raise RuntimeError(f"Failed to load config: {e}") from e
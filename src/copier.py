@@ -1,38 +1,143 @@
 import atexit
 import os
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from threading import Lock
+from queue import Queue
+from threading import BoundedSemaphore, Lock, Thread, local
 from typing import Callable, Optional
 
 from src.i18n import _
+from .compress import COMPRESSED_SUFFIX, compress_file, compressible, resolve_codec
 from .config import Settings
-from .utils import copy2, same_file, iter_files, notify_user
+from .dedup import STORE_DIR, BlobStore
+from .delta import delta_copy
+from .hashing import ALGORITHMS, DEFAULT_ALGORITHM, DigestCache, file_digest, sampled_digest
+from .manifest import MANIFEST_NAME, Manifest, ManifestEntry
+from .mirror import remove_empty_dirs, sorted_orphans, split_case_aliases, target_keys
+from .pack import PACK_DIR, PackStore
+from .snapshots import SNAPSHOT_DIR, hardlinks_supported, new_snapshot, prune
+from .throttle import Throttle
+from .utils import DirCache, FileEntry, TargetIndex, copy2, human_readable, iter_entries, mirror_key, notify_user
+
+_QUEUE_SIZE = 1024
+_LANE_DEPTH = 4  # queued copy tasks per worker
+_PROGRESS_INTERVAL = 0.2
+_CHECKPOINT_INTERVAL = 30.0  # seconds between manifest saves during a run
+_SMALL_BUF_SIZE = 256 * 1024  # the buffered fallback allocates it per file
+_LARGE_BUF_SIZE = 8 * 1024 * 1024
+_DONE = object()
+
+
+_ENGINE = "engine:"  # counter-name prefix for files per copy strategy
 
 
 @dataclass
 class Stats:
-    scanned: int = 0
-    copied: int = 0
-    unchanged: int = 0
-    errors: int = 0
-    _lock: Lock = Lock()
+    """
+    Run counters. Every thread bumps its own set, registered on first use, so
+    workers never contend on a lock; readers sum the sets when asked (on
+    progress ticks and at the end). ``phases`` holds wall-clock seconds per
+    pipeline stage; the stages overlap, scanning runs alongside comparing and
+    copying. The copy stage is the span from the first copy task starting to
+    the last one finishing, which throughput is measured over.
+    """
+    phases: dict[str, float] = field(default_factory=dict)
+    _shards: list[dict[str, int]] = field(default_factory=list, repr=False)
+    _local: local = field(default_factory=local, repr=False)
+    _lock: Lock = field(default_factory=Lock, repr=False)  # taken once per thread, to register its shard
+    _spans: dict[str, tuple[float, float]] = field(default_factory=dict, repr=False)
+
+    def _shard(self) -> dict[str, int]:
+        try:
+            return self._local.counts
+        except AttributeError:
+            counts = self._local.counts = {}
+            with self._lock:
+                self._shards.append(counts)
+            return counts
+
+    def inc(self, field: str, n: int = 1) -> None:
+        counts = self._shard()
+        counts[field] = counts.get(field, 0) + n
+
+    def total(self, field: str) -> int:
+        return sum(shard.get(field, 0) for shard in list(self._shards))
+
+    def _merged(self) -> dict[str, int]:
+        merged: dict[str, int] = {}
+        for shard in list(self._shards):
+            for k, v in shard.copy().items():
+                merged[k] = merged.get(k, 0) + v
+        return merged
+
+    scanned = property(lambda self: self.total("scanned"))
+    copied = property(lambda self: self.total("copied"))
+    unchanged = property(lambda self: self.total("unchanged"))
+    errors = property(lambda self: self.total("errors"))
+    deleted = property(lambda self: self.total("deleted"))
 
-    def inc(self, field: str):
+    def scanned_file(self, size: Optional[int]) -> None:
+        self.inc("scanned")
+        self.inc("bytes_scanned", size or 0)
+
+    def copied_with(self, strategy: str, size: Optional[int]) -> None:
+        self.inc("copied")
+        self.inc("bytes_copied", size or 0)
+        self.inc(_ENGINE + strategy)
+
+    def add_compressed(self, logical: int, stored: int) -> None:
+        self.inc("compressed_in", logical)
+        self.inc("compressed_out", stored)
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + time.monotonic() - t0
+
+    def add_span(self, name: str, start: float, end: float) -> None:
+        # widens phase name to cover [start, end]; called once per worker thread
         with self._lock:
-            setattr(self, field, getattr(self, field) + 1)
+            first, last = self._spans.get(name, (start, end))
+            first, last = min(first, start), max(last, end)
+            self._spans[name] = (first, last)
+            self.phases[name] = last - first
 
     def summary(self) -> str:
-        return _("Scanned: {scanned} | Copied: {copied} | "
+        c = self._merged()
+        text = _("Scanned: {scanned} | Copied: {copied} | "
                  "Unchanged: {unchanged} | Errors: {errors}").format(
-            scanned=self.scanned,
-            copied=self.copied,
-            unchanged=self.unchanged,
-            errors=self.errors
+            scanned=c.get("scanned", 0),
+            copied=c.get("copied", 0),
+            unchanged=c.get("unchanged", 0),
+            errors=c.get("errors", 0)
         )
+        if c.get("deleted"):
+            text += " | " + _("Deleted: {deleted}").format(deleted=c["deleted"])
+        strategies = sorted((k[len(_ENGINE):], v) for k, v in c.items() if k.startswith(_ENGINE))
+        if strategies:
+            text += " | " + _("Engine: {strategies}").format(
+                strategies=", ".join(f"{k} {v}" for k, v in strategies))
+        if c.get("compressed_in"):
+            text += " | " + _("Compressed: {logical} → {stored}").format(
+                logical=human_readable(c["compressed_in"]), stored=human_readable(c["compressed_out"]))
+        text += " | " + _("Size: {scanned} scanned, {copied} copied").format(
+            scanned=human_readable(c.get("bytes_scanned", 0)), copied=human_readable(c.get("bytes_copied", 0)))
+        copy_time = self.phases.get("copy")
+        if copy_time and c.get("copied"):
+            text += " | " + _("Throughput: {files:.1f} files/s, {rate}/s").format(
+                files=c["copied"] / copy_time, rate=human_readable(c.get("bytes_copied", 0) / copy_time))
+        if self.phases:
+            text += " | " + _("Time: {phases}").format(
+                phases=", ".join(f"{k} {v:.1f}s" for k, v in self.phases.items()))
+        return text
 
 
 def run_backup(
@@ -40,6 +145,7 @@ def run_backup(
         progress_cb: Optional[Callable[[int, int], None]] = None,
         log_cb: Optional[Callable[[str], None]] = None,
         use_hash: bool = False,
+        hash_algorithm: Optional[str] = None,
 ) -> bool:
     stats = Stats()
 
@@ -73,6 +179,26 @@ def run_backup(
             notify_user(_("Backup error"), message, icon=0x00000010)
         return False
 
+    def _save_manifest() -> None:
+        # the pack index goes first: the manifest must not vouch for packed files it
+        # lost, so if it can't be written their entries wait for a save that can
+        hold: set[str] = set()
+        try:
+            if packer is not None:
+                packer.close()
+        except Exception as e:
+            hold = packer.uncommitted()
+            _log(_("⚠️ Could not update pack index: {0}").format(e))
+        try:
+            manifest.save(hold)
+        except Exception as e:
+            _log(_("⚠️ Could not update backup manifest: {0}").format(e))
+        try:
+            if digests is not None:
+                digests.save()
+        except Exception as e:
+            _log(_("⚠️ Could not update digest cache: {0}").format(e))
+
     _log(_("🔍 Starting backup…"))
     tgt_root = Path(cfg.target_dir).expanduser().resolve()
     if tgt_root.exists():
@@ -94,10 +220,6 @@ def run_backup(
 
     use_tqdm = (tqdm is not None and progress_cb is None and log_cb is None)
 
-    _log(_("📂 Scanning files…"))
-    all_files = [f for rule in cfg.sources for f in iter_files(rule)]
-    stats.scanned = len(all_files)
-
     def _pause_console():
         if stats.errors:
             input(_("\n⚠️ Backup finished with errors. Press Enter to exit…"))
@@ -107,63 +229,437 @@ def run_backup(
 
     if progress_cb is None and log_cb is None and cfg.wait_on_finish:
         atexit.register(_pause_console)
-    tasks: list[tuple[Path, Path]] = []
+    manifest = Manifest.load(tgt_root)
+    snapshot = previous = None
+    snapshot_links = False
+    if cfg.snapshots:
+        snapshot, previous = new_snapshot(tgt_root)
+        _log(_("🗂 Writing snapshot {0}").format(snapshot.name))
+        snapshot_links = hardlinks_supported(snapshot)
+        if not snapshot_links:
+            _log(_("⚠️ Target does not support hardlinks, unchanged files are copied into every snapshot"))
+        if cfg.pack_small_files:
+            _log(_("⚠️ Small files are not packed in snapshot mode"))
+    tgt_str = str(snapshot or tgt_root)
+    # where the last run's files are: compared against and, for snapshots, linked
+    # from (the plain mirror in the root before the first snapshot)
+    ref_str = str(previous or tgt_root)
+    target = TargetIndex()
+    dirs = DirCache()
+    # loaded even with packing off, so files leaving the pack are dropped from its index
+    packer = (PackStore.load(tgt_root, cfg.pack_segment_size)
+              if not cfg.snapshots and (cfg.pack_small_files or (tgt_root / PACK_DIR).is_dir()) else None)
+    algorithm = hash_algorithm or cfg.hash_algorithm
+    if (use_hash or cfg.dedup) and algorithm not in ALGORITHMS:
+        _log(_("⚠️ Hash algorithm \"{0}\" is not available, using {1}").format(algorithm, DEFAULT_ALGORITHM))
+        algorithm = DEFAULT_ALGORITHM
+    # dedup names blobs by the same digests hash mode compares, so both share the cache
+    digests = DigestCache.load(algorithm=algorithm) if use_hash or cfg.dedup else None
+    blobs = BlobStore(tgt_root) if cfg.dedup else None
+    try:
+        codec = resolve_codec(cfg.compression)
+    except KeyError:
+        codec = resolve_codec("auto")
+        _log(_("⚠️ Compression \"{0}\" is not available, using {1}").format(cfg.compression, codec))
 
-    _log(_("🛠 Analyzing files on changes…"))
-    iterator = (tqdm(all_files, desc=_("Analyzing…"), unit="file")
-                if use_tqdm else all_files)
+    hash_slots = BoundedSemaphore(cfg.hash_workers * 2)
 
-    for idx, src in enumerate(iterator, start=1):
-        dst = tgt_root / src.drive.rstrip(":") / src.relative_to(src.anchor)
-        if same_file(src, dst, use_hash):
-            stats.inc("unchanged")
+    def _sampled(f: FileEntry) -> bool:
+        return 0 < cfg.sample_threshold <= f.size
+
+    def _submit_hash_check(pool: ThreadPoolExecutor, f: FileEntry, key: str) -> None:
+        # the source digest comes from the cache unless the file's metadata
+        # changed; the target one is what we recorded when writing it, and
+        # only read back (concurrently with the source) when there is none
+        entry = manifest.get(key)
+        has_digest = entry is not None and entry.digest is not None and entry.digest.startswith(algorithm + ":")
+        hash_slots.acquire()
+        if (has_digest and entry.sample is not None and _sampled(f)
+                and entry.size == f.size and entry.mtime_ns == f.mtime_ns):
+            pool.submit(_finish_sampled_check, f, key, entry)
+            return
+        dst_fut = None
+        stored_as_is = not (packer is not None and key in packer) and (entry is None or entry.stored is None)
+        if not has_digest and stored_as_is:
+            # packed and compressed files can't be read back as they are; they get
+            # their digest when written, those written by another algorithm are rewritten
+            dst = os.path.join(ref_str, f.rel)
+            ds = target.stat(dst)
+            if ds is None or ds.st_size != f.size:
+                hash_slots.release()
+                _route(f, key, False)
+                return
+            # queued ahead of the source job, so a worker waiting on it can't deadlock the pool
+            dst_fut = pool.submit(file_digest, dst, algorithm)
+        pool.submit(_finish_hash_check, f, key, entry, dst_fut)
+
+    def _verified(f: FileEntry, entry: Optional[ManifestEntry], digest: str,
+                  sample: Optional[str]) -> ManifestEntry:
+        # an unchanged file keeps how it is stored (compressed size, delta chunk map)
+        return (entry or ManifestEntry(f.size, f.mtime_ns))._replace(
+            size=f.size, mtime_ns=f.mtime_ns, digest=digest, sample=sample, verified=time.time())
+
+    def _finish_hash_check(f: FileEntry, key: str, entry: Optional[ManifestEntry],
+                           dst_fut: Optional[Future]) -> None:
+        unchanged, record = False, None
+        try:
+            src_digest = digests.digest(f.path, f.size, f.mtime_ns, f.ino)
+            dst_digest = dst_fut.result() if dst_fut is not None else entry and entry.digest
+            unchanged = dst_digest == src_digest
+            sample = sampled_digest(f.path, algorithm, cfg.sample_blocks) if _sampled(f) else None
+            record = _verified(f, entry if unchanged else None, src_digest, sample)
+        except OSError:
+            pass
+        finally:
+            hash_slots.release()
+            _route(f, key, unchanged, record)
+
+    def _finish_sampled_check(f: FileEntry, key: str, entry: ManifestEntry) -> None:
+        # large files whose size and mtime are as recorded: a matching sample is
+        # trusted until the periodic full verification is due, a differing one
+        # escalates to a full digest; changed metadata always gets a full one
+        unchanged, record = False, None
+        try:
+            sample = sampled_digest(f.path, algorithm, cfg.sample_blocks)
+            verify_due = time.time() - (entry.verified or 0) >= cfg.full_verify_days * 86400
+            if sample == entry.sample and not verify_due:
+                unchanged = True
+            else:
+                src_digest = digests.digest(f.path, f.size, f.mtime_ns, f.ino, refresh=True)
+                unchanged = src_digest == entry.digest
+                record = _verified(f, entry if unchanged else None, src_digest, sample)
+        except OSError:
+            pass
+        finally:
+            hash_slots.release()
+            _route(f, key, unchanged, record)
+
+    # scan → compare → copy run concurrently, connected by bounded queues,
+    # so copying starts with the first changed file and memory stays flat
+    scan_q: Queue = Queue(maxsize=_QUEUE_SIZE)
+
+    # what mirror sync needs to know about the walk: keys seen, directories it couldn't list
+    seen: list[str] = []
+    unreadable: list[str] = []
+    scan_failed = False
+
+    def _scan() -> None:
+        nonlocal scan_failed
+        try:
+            with stats.phase("scan"):
+                for rule in cfg.sources:
+                    for f in iter_entries(rule, cfg.scan_workers, unreadable=unreadable):
+                        stats.scanned_file(f.size)
+                        scan_q.put(f)
+        except Exception as exc:
+            scan_failed = True
+            stats.inc("errors")
+            _log(_("❗ Error scanning files ({exc})").format(exc=exc), is_error=True)
+        finally:
+            scan_q.put(_DONE)
+
+    limits = cfg.limits
+    throttle = Throttle(limits.max_bytes_per_sec, limits.max_files_per_sec)
+
+    def _drop_previous_form(key: str, dst: str, prev: Optional[ManifestEntry], was_packed: bool,
+                            strategy: str, compressed: bool) -> None:
+        # a file may move between plain mirror, compressed mirror and pack; remove what the last run left
+        if strategy != "pack" and was_packed:
+            packer.discard(key)
+        if prev is None or was_packed:
+            return
+        if prev.stored is not None and not compressed:
+            Path(dst + COMPRESSED_SUFFIX).unlink(missing_ok=True)
+        elif prev.stored is None and (compressed or strategy == "pack"):
+            Path(dst).unlink(missing_ok=True)
+
+    def _dedup(f: FileEntry, dst: str, record: ManifestEntry, buf_size: Optional[int]) -> tuple[str, str]:
+        # returns (strategy, digest); falls back to a plain copy if the target can't hardlink
+        digest = record.digest
+        if digest is None or not digest.startswith(algorithm + ":"):
+            digest = digests.digest(f.path, f.size, f.mtime_ns, f.ino)
+        dirs.ensure(os.path.dirname(dst))
+        try:
+            existed = blobs.link(digest, f.path, dst, lambda s, d: copy2(Path(s), Path(d), buf_size, throttle))
+        except OSError as exc:
+            if blobs.links_supported:
+                raise
+            _log(_("⚠️ Target does not support hardlinks, deduplication disabled ({0})").format(exc))
+            return copy2(Path(f.path), Path(dst), buf_size, throttle, dirs), digest
+        return ("dedup" if existed else "dedup-store"), digest
+
+    def _link_unchanged(f: FileEntry, dst: str, key: str) -> None:
+        # snapshot mode: an unchanged file is a hardlink to its copy in the previous
+        # snapshot, unless that copy is gone, isn't what the manifest says or the
+        # target can't link; it is copied then, and counted as such
+        entry = manifest.get(key)
+        suffix = COMPRESSED_SUFFIX if entry is not None and entry.stored is not None else ""
+        src = os.path.join(ref_str, f.rel) + suffix
+        linked = False
+        if snapshot_links:
+            try:
+                linked = os.stat(src).st_size == (entry.stored if suffix else f.size)
+                if linked:
+                    dirs.ensure(os.path.dirname(dst))
+                    os.link(src, dst + suffix)
+            except OSError:
+                linked = False
+        if not linked:
+            strategy = copy2(Path(f.path), Path(dst), _SMALL_BUF_SIZE, throttle, dirs)
+            manifest.put(key, ManifestEntry(f.size, f.mtime_ns, entry.digest if entry is not None else None))
+            stats.inc("unchanged", -1)
+            stats.copied_with(strategy, f.size)
+
+    def _hasher(record: ManifestEntry):
+        # packed and compressed files can't be hashed back from the target, so
+        # their digest is taken while they are written, for later hash-mode runs
+        if record.digest is None and algorithm in ALGORITHMS:
+            return ALGORITHMS[algorithm]()
+        return None
+
+    def _with_digest(record: ManifestEntry, hasher) -> ManifestEntry:
+        return record if hasher is None else record._replace(digest=f"{algorithm}:{hasher.hexdigest()}")
+
+    def _copy_worker(lane: Queue, buf_size: Optional[int]) -> None:
+        first = last = None  # busy span of this worker
+        while (task := lane.get()) is not _DONE:
+            f, dst, key, record, link = task
+            if first is None:
+                first = time.monotonic()
+            try:
+                throttle.file()
+                if link:
+                    _link_unchanged(f, dst, key)
+                    continue
+                prev = manifest.get(key)
+                was_packed = packer is not None and key in packer
+                compressed = False
+                written = f.size  # bytes that reached the target, for the throughput
+                if f.size is not None:
+                    record = record or ManifestEntry(f.size, f.mtime_ns)
+                if _packed(f):
+                    throttle.bytes(f.size)
+                    hasher = _hasher(record)
+                    packer.add(key, f.path, hasher)
+                    record = _with_digest(record, hasher)
+                    strategy = "pack"
+                elif f.size is not None and 0 < cfg.delta_threshold <= f.size:
+                    written, chunks = delta_copy(Path(f.path), Path(dst), prev.chunks if prev else None,
+                                                 throttle=throttle, dirs=dirs)
+                    record = record._replace(chunks=chunks)
+                    strategy = "delta"
+                elif (blobs is not None and blobs.links_supported and f.size is not None
+                      and f.size >= cfg.dedup_min_size):
+                    strategy, digest = _dedup(f, dst, record, buf_size)
+                    record = record._replace(digest=digest)
+                    if strategy == "dedup":
+                        written = 0
+                elif codec is not None and f.size is not None and compressible(f.path, f.rel):
+                    dirs.ensure(os.path.dirname(dst))
+                    hasher = _hasher(record)
+                    stored = compress_file(f.path, dst + COMPRESSED_SUFFIX, codec, throttle, hasher)
+                    stats.add_compressed(f.size, stored)
+                    record = _with_digest(record, hasher)._replace(stored=stored)
+                    compressed = True
+                    strategy = codec
+                else:
+                    resumable = f.size is not None and f.size >= cfg.large_file_threshold
+                    strategy = copy2(Path(f.path), Path(dst), buf_size, throttle, dirs, resumable)
+                _drop_previous_form(key, dst, prev, was_packed, strategy, compressed)
+                if blobs is not None and prev is not None and prev.digest and prev.digest != record.digest:
+                    blobs.release(prev.digest)
+                stats.copied_with(strategy, written)
+                if record is not None:
+                    manifest.put(key, record)
+            except Exception as exc:
+                stats.inc("errors")
+                _log(_("❗ Error copying {src} → {dst} ({exc})").format(
+                    src=f.path, dst=dst, exc=exc), is_error=True)
+            finally:
+                last = time.monotonic()
+        if first is not None:
+            stats.add_span("copy", first, last)
+
+    bar = tqdm(total=0, desc=_("Backing up…"), unit="file") if use_tqdm else None
+
+    last_checkpoint = time.monotonic()
+
+    def _report() -> None:
+        nonlocal last_checkpoint
+        done = stats.unchanged + stats.copied + stats.errors
+        if bar is not None:
+            bar.total = stats.scanned
+            bar.update(done - bar.n)
         else:
-            tasks.append((src, dst))
-        if not use_tqdm:
-            _prog(idx, stats.scanned)
-    if not use_tqdm and not progress_cb:
+            _prog(done, stats.scanned)
+        if time.monotonic() - last_checkpoint >= _CHECKPOINT_INTERVAL:
+            # the manifest doubles as the journal of finished files: a run that
+            # gets killed resumes from the last checkpoint instead of from scratch
+            _save_manifest()
+            last_checkpoint = time.monotonic()
+
+    queued = 0
+    queued_lock = Lock()
+
+    def _sync_mirror() -> None:
+        # files (and then directories) on the target that the source walk no longer produced
+        missing = [r.source for r in cfg.sources if not Path(r.source).expanduser().exists()]
+        if scan_failed or missing:
+            _log(_("⚠️ Mirror sync skipped: not every source could be scanned"))
+            return
+        seen.sort()
+        known = manifest.keys()
+        if cfg.mirror_scan_target and snapshot is None:
+            own = (MANIFEST_NAME, PACK_DIR, STORE_DIR, SNAPSHOT_DIR)
+            known = sorted(set(known).union(target_keys(tgt_root, own, cfg.scan_workers)))
+        protected = tuple(mirror_key(d) + "/" for d in unreadable)
+        orphans = [k for k in sorted_orphans(known, seen) if not k.startswith(protected)]
+        orphans, aliases = split_case_aliases(orphans, seen)
+        for key in aliases:
+            manifest.remove(key)  # the file is live under its new key; only the record goes
+        if not orphans:
+            return
+        if len(orphans) > cfg.max_delete_fraction * len(known):
+            _log(_("⚠️ Mirror sync skipped: {0} of {1} files would be deleted, more than the allowed {2:.0%}")
+                 .format(len(orphans), len(known), cfg.max_delete_fraction))
+            return
+        dirs = set()
+        for key in orphans:
+            entry = manifest.get(key)
+            if snapshot is None:  # a new snapshot simply doesn't contain them
+                path = os.path.join(tgt_str, key.replace("/", os.sep))
+                try:
+                    Path(path).unlink(missing_ok=True)
+                    Path(path + COMPRESSED_SUFFIX).unlink(missing_ok=True)
+                except OSError as exc:
+                    stats.inc("errors")
+                    _log(_("❗ Error deleting {path} ({exc})").format(path=path, exc=exc), is_error=True)
+                    continue
+                dirs.add(os.path.dirname(path))
+                if packer is not None:
+                    packer.discard(key)
+                if blobs is not None and entry is not None and entry.digest:
+                    blobs.release(entry.digest)
+            manifest.remove(key)
+            stats.inc("deleted")
+        remove_empty_dirs(dirs, tgt_str)
+        _log(_("🗑 Removed {0} files that are no longer in the sources").format(stats.deleted))
+
+    def _packed(f: FileEntry) -> bool:
+        return (packer is not None and cfg.pack_small_files and f.size is not None
+                and f.size < cfg.pack_threshold)
+
+    def _prepare(f: FileEntry) -> str:
+        # create the destination directory here, ahead of the copy workers, which
+        # then find it in the cache; a failure resurfaces (and is logged) in the worker.
+        # Packed files don't land in the mirror, so they need none
+        dst = os.path.join(tgt_str, f.rel)
+        if not _packed(f):
+            try:
+                dirs.ensure(os.path.dirname(dst))
+            except OSError:
+                pass
+        return dst
+
+    def _route(f: FileEntry, key: str, unchanged: bool, record: Optional[ManifestEntry] = None) -> None:
+        # record: what the manifest should say once the file is on the target
+        nonlocal queued
+        if unchanged:
+            if record is not None:
+                manifest.put(key, record)
+            stats.inc("unchanged")
+            if snapshot is not None:
+                small_q.put((f, _prepare(f), key, None, True))
+            return
+        lane = large_q if f.size is not None and f.size >= cfg.large_file_threshold else small_q
+        lane.put((f, _prepare(f), key, record, False))
+        with queued_lock:
+            queued += 1
+
+    _log(_("📂 Scanning and analyzing files…"))
+    small_n, large_n = cfg.small_file_workers, cfg.large_file_workers
+    if limits.max_copy_workers:
+        # keep at least one worker per lane, give the large lane up to half
+        large_n = min(large_n, max(1, limits.max_copy_workers // 2))
+        small_n = min(small_n, max(1, limits.max_copy_workers - large_n))
+    # changed files are split by size into two lanes, so a few huge files
+    # can't hold up thousands of small ones (or the other way round); workers
+    # pull from them, and a full lane blocks the compare loop, so the tasks in
+    # flight stay a few per worker however many files changed
+    small_q: Queue = Queue(maxsize=small_n * _LANE_DEPTH)
+    large_q: Queue = Queue(maxsize=large_n * _LANE_DEPTH)
+    lanes = [(small_q, small_n, _SMALL_BUF_SIZE), (large_q, large_n, _LARGE_BUF_SIZE)]
+    Thread(target=_scan, daemon=True).start()
+    with ThreadPoolExecutor(max_workers=small_n + large_n) as executor:
+        workers = [executor.submit(_copy_worker, lane, buf_size)
+                   for lane, count, buf_size in lanes for _ in range(count)]
+
+        try:
+            with (stats.phase("compare"),
+                  ThreadPoolExecutor(max_workers=cfg.hash_workers) if use_hash else nullcontext() as hash_pool):
+                for f in iter(scan_q.get, _DONE):
+                    key = f.rel.replace(os.sep, "/")
+                    if cfg.mirror_sync:
+                        seen.append(key)
+                    if f.size is None:
+                        _route(f, key, False)
+                    elif use_hash:
+                        _submit_hash_check(hash_pool, f, key)
+                    elif manifest.matches(key, f.size, f.mtime_ns):
+                        _route(f, key, True)
+                    elif packer is not None and packer.matches(key, f.size, f.mtime_ns):
+                        _route(f, key, True, ManifestEntry(f.size, f.mtime_ns))
+                    else:
+                        dst = os.path.join(ref_str, f.rel)
+                        _route(f, key, target.same_file(dst, f.size, f.mtime_ns),
+                               ManifestEntry(f.size, f.mtime_ns))
+                    _report()
+        finally:
+            for lane, count, _buf in lanes:
+                for _w in range(count):
+                    lane.put(_DONE)
+        if queued:
+            if bar is None and not progress_cb:
+                print()
+            _log(_("▶ {tasks} files to copy, {unchanged} unchanged")
+                 .format(tasks=queued, unchanged=stats.unchanged))
+        while wait(workers, timeout=_PROGRESS_INTERVAL).not_done:
+            _report()
+        _report()
+    if bar is not None:
+        bar.close()
+    elif not progress_cb:
         print()
 
-    if not tasks:
+    if cfg.mirror_sync:
+        with stats.phase("sync"):
+            _sync_mirror()
+    with stats.phase("save"):
+        _save_manifest()
+        if packer is not None:
+            try:
+                reclaimed = packer.compact()
+                if reclaimed:
+                    _log(_("🧹 Compacted the pack, {0} freed").format(human_readable(reclaimed)))
+            except Exception as e:
+                _log(_("⚠️ Could not compact the pack: {0}").format(e))
+    if snapshot is not None:
+        try:
+            removed = prune(tgt_root, cfg.keep_daily, cfg.keep_weekly)
+            if removed:
+                _log(_("🧹 Removed {0} old snapshots").format(len(removed)))
+                if blobs is not None:
+                    blobs.prune()
+        except Exception as e:
+            _log(_("⚠️ Could not prune old snapshots: {0}").format(e))
+    if not queued and not stats.copied and not stats.deleted and not stats.errors:
         _log(_("✅ No changes detected. Backup not required."))
         _log(stats.summary())
         if progress_cb:
             progress_cb(0, 0)
         return _finalize(True)
-    _log(_("▶ {tasks} files to copy, {unchanged} unchanged")
-         .format(tasks=len(tasks), unchanged=stats.unchanged))
-
-    done = 0
-    max_workers = min(8, (os.cpu_count() or 4) * 2)
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(copy2, src, dst): (src, dst) for src, dst in tasks}
-
-        if use_tqdm:
-            copy_iter = tqdm(
-                as_completed(futures),
-                total=len(tasks),
-                desc=_("Copying…"),
-                unit="file"
-            )
-        else:
-            copy_iter = as_completed(futures)
-
-        for future in copy_iter:
-            src, dst = futures[future]
-            try:
-                future.result()
-                stats.inc("copied")
-            except Exception as exc:
-                stats.inc("errors")
-                _log(_("❗ Error copying {src} → {dst} ({exc})").format(
-                    src=src, dst=dst, exc=exc), is_error=True)
-            done += 1
-            if not use_tqdm:
-                _prog(done, len(tasks))
 
     _log(stats.summary())
-    if progress_cb:
-        progress_cb(len(tasks), len(tasks))
 
     if stats.errors:
         desktop = Path.home() / "Desktop"
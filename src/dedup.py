@@ -0,0 +1,96 @@
+import os
+import uuid
+from pathlib import Path
+from typing import Callable
+
+from src.utils import DirCache
+
+STORE_DIR = ".backup_store"
+
+
+class BlobStore:
+    """
+    Content-addressed store under ``.backup_store`` in the target root: every
+    distinct content is written once, named by its digest, and mirror paths
+    are hardlinks to it. Identical files under different sources then cost one
+    copy in bytes written and in space.
+
+    Hardlinks share metadata, so a mirror's timestamps are those of whichever
+    source was linked last; change detection relies on the manifest, which
+    keeps the real ones. A blob whose only link is its own name is orphaned
+    and removed by ``release``.
+    """
+
+    def __init__(self, root: Path):
+        self.dir = root / STORE_DIR
+        self.links_supported = True  # cleared when the target filesystem refuses hardlinks
+        self._dirs = DirCache()
+
+    def blob_path(self, digest: str) -> str:
+        algo, _, hexdigest = digest.partition(":")
+        return os.path.join(self.dir, algo, hexdigest[:2], hexdigest[2:])
+
+    def link(self, digest: str, src: str, dst: str, copy: Callable[[str, str], object]) -> bool:
+        """
+        Make dst a hardlink to the blob for digest, storing src as that blob
+        first (through ``copy``) if the store doesn't have it yet.
+
+        Returns:
+            True if the blob was already stored, i.e. no content was written.
+
+        Raises:
+            OSError: if linking is refused; ``links_supported`` is cleared then.
+        """
+        blob = self.blob_path(digest)
+        existed = True
+        for _attempt in range(2):
+            if not os.path.exists(blob):
+                existed = False
+                self._dirs.ensure(os.path.dirname(blob))
+                tmp = f"{blob}.{uuid.uuid4().hex}.tmp"
+                try:
+                    copy(src, tmp)
+                    os.replace(tmp, blob)  # a concurrent writer of the same content wins harmlessly
+                except BaseException:
+                    Path(tmp).unlink(missing_ok=True)
+                    raise
+            tmp = f"{dst}.{uuid.uuid4().hex}.tmp"
+            try:
+                os.link(blob, tmp)
+                os.replace(tmp, dst)  # dst is never missing, even if the run stops here
+                return existed
+            except FileNotFoundError:
+                if not os.path.exists(os.path.dirname(dst)):
+                    raise
+                continue  # released by another worker in between: store it again
+            except OSError:
+                self.links_supported = False
+                raise
+        raise FileNotFoundError(blob)
+
+    def release(self, digest: str) -> None:
+        """
+        Remove the blob for digest if no mirror links to it any more.
+        """
+        blob = self.blob_path(digest)
+        try:
+            if os.stat(blob).st_nlink <= 1:
+                os.unlink(blob)
+        except FileNotFoundError:
+            pass
+
+    def prune(self) -> int:
+        """
+        Remove every blob no mirror links to any more, e.g. after old snapshots were deleted.
+
+        Returns:
+            Number of blobs removed.
+        """
+        removed = 0
+        for dirpath, _dirs, files in os.walk(self.dir):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                if os.stat(path).st_nlink <= 1:
+                    os.unlink(path)
+                    removed += 1
+        return removed
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import shutil
+import struct
+from pathlib import Path
+from typing import Optional
+
+from src.throttle import Throttle
+from src.utils import DirCache, copy2
+
+DELTA_CHUNK_SIZE = 1024 * 1024
+_DIGEST_SIZE = 16
+_HEADER = struct.Struct("<I")  # chunk size the map was built with
+_MARKER_SUFFIX = ".bkdelta"
+
+
+def _chunk_digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=_DIGEST_SIZE).digest()
+
+
+def _parse_map(chunk_map: Optional[bytes], chunk_size: int, dst_size: int) -> Optional[list[bytes]]:
+    """
+    Per-chunk digests from a stored map, or None if it can't describe dst as it is now.
+    """
+    if not chunk_map or len(chunk_map) < _HEADER.size:
+        return None
+    if _HEADER.unpack_from(chunk_map)[0] != chunk_size:
+        return None
+    body = chunk_map[_HEADER.size:]
+    digests = [body[i:i + _DIGEST_SIZE] for i in range(0, len(body), _DIGEST_SIZE)]
+    if len(digests) != -(-dst_size // chunk_size):
+        return None
+    return digests
+
+
+def delta_copy(
+        src: Path,
+        dst: Path,
+        previous_map: Optional[bytes] = None,
+        chunk_size: int = DELTA_CHUNK_SIZE,
+        throttle: Optional[Throttle] = None,
+        dirs: Optional[DirCache] = None,
+) -> tuple[int, Optional[bytes]]:
+    """
+    Update dst in place so it matches src, rewriting only the fixed-size chunks
+    that differ. Chunks are compared against ``previous_map`` (the map returned
+    by the last delta_copy of this file) when it still fits dst, otherwise by
+    reading dst back. A missing dst is written in full through a resumable
+    copy2, without a chunk map: the next update reads it back instead.
+
+    dst is updated in place, so a marker file sits next to it while chunks are
+    being written; if an interrupted run left one behind, previous_map no
+    longer describes dst and is ignored.
+
+    Returns:
+        (bytes written, chunk map of the new content or None)
+    """
+    if dirs is not None:
+        dirs.ensure(str(dst.parent))
+    else:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        ds = os.stat(dst, follow_symlinks=False)
+        if ds.st_nlink > 1:
+            os.unlink(dst)  # never rewrite content shared with other links
+            ds = None
+    except FileNotFoundError:
+        ds = None
+
+    marker = Path(f"{dst}{_MARKER_SUFFIX}")
+    if ds is None:
+        marker.unlink(missing_ok=True)
+        copy2(src, dst, throttle=throttle, dirs=dirs, resumable=True)
+        return os.path.getsize(dst), None
+    if marker.exists():
+        previous_map = None
+    marker.touch()
+    previous = _parse_map(previous_map, chunk_size, ds.st_size)
+    new_map = bytearray(_HEADER.pack(chunk_size))
+    written = offset = 0
+    with open(src, "rb") as fs, open(dst, "r+b") as fd:
+        dst_size = ds.st_size
+        idx = 0
+        while chunk := fs.read(chunk_size):
+            digest = _chunk_digest(chunk)
+            new_map += digest
+            if offset + len(chunk) > dst_size:
+                same = False
+            elif previous is not None:
+                same = previous[idx] == digest
+            else:
+                fd.seek(offset)
+                same = fd.read(len(chunk)) == chunk
+            if not same:
+                if throttle is not None:
+                    throttle.bytes(len(chunk))
+                fd.seek(offset)
+                fd.write(chunk)
+                written += len(chunk)
+            offset += len(chunk)
+            idx += 1
+        fd.truncate(offset)
+    shutil.copystat(src, dst, follow_symlinks=False)
+    marker.unlink()
+    return written, bytes(new_map)
@@ -0,0 +1,134 @@
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Optional
+
+_END = ""  # marks an excluded node; never a real path component
+_FLAGS = re.IGNORECASE if os.name == "nt" else 0
+
+
+def _translate(pat: str) -> str:
+    """
+    Translate one gitignore-style glob into a regex over '/'-separated paths.
+    """
+    out: list[str] = []
+    i, n = 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if pat.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pat.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[" and (j := pat.find("]", i + 2)) != -1:
+            cls = pat[i + 1:j].replace("\\", "\\\\")
+            if cls.startswith("!"):
+                cls = "^" + cls[1:]
+            out.append(f"[{cls}]")
+            i = j + 1
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def compile_patterns(patterns: Iterable[str]) -> tuple[Optional[re.Pattern], Optional[re.Pattern]]:
+    """
+    Compile gitignore-style patterns into two combined regexes.
+
+    Patterns without a slash match an entry name at any depth, the rest match the
+    path relative to the rule root; ``**`` spans directories and a trailing slash
+    restricts a pattern to directories. Subjects are given with a trailing '/'
+    for directories. Negation (``!``) is not supported; PathRule rejects it.
+
+    Returns:
+        (name_regex, path_regex), either of which is None if no pattern needs it.
+    """
+    by_name: list[str] = []
+    by_path: list[str] = []
+    for raw in patterns:
+        pat = raw.strip()
+        if not pat or pat.startswith("#"):
+            continue
+        dir_only = pat.endswith("/")
+        pat = pat.rstrip("/")
+        anchored = "/" in pat
+        body = _translate(pat.lstrip("/")) + ("/" if dir_only else "/?")
+        (by_path if anchored else by_name).append(f"(?:{body})")
+
+    def _join(parts: list[str]) -> Optional[re.Pattern]:
+        return re.compile("|".join(parts), _FLAGS) if parts else None
+
+    return _join(by_name), _join(by_path)
+
+
+class ExcludeMatcher:
+    """
+    PathRule.excludes compiled once into a trie of path components below the
+    rule root, plus PathRule.patterns compiled into combined regexes, so that
+    checking a path costs O(depth) regardless of how many exclusions the rule has.
+    """
+
+    def __init__(self, root: Path, excludes: Iterable[str], patterns: Iterable[str] = ()):
+        root_str = str(root)
+        self._root_len = len(root_str)
+        self._prefix_len = len(root_str) if root_str.endswith(os.sep) else len(root_str) + 1
+        self._trie: dict = {}
+        for e in excludes:
+            try:
+                rel = (root / Path(e)).resolve().relative_to(root)
+            except ValueError:
+                continue  # outside the root: nothing under it can match
+            node = self._trie
+            for part in rel.parts:
+                if _END in node:
+                    break
+                node = node.setdefault(os.path.normcase(part), {})
+            else:
+                node.clear()
+                node[_END] = True
+        self._by_name, self._by_path = compile_patterns(patterns)
+
+    def __bool__(self) -> bool:
+        return bool(self._trie) or self._by_name is not None or self._by_path is not None
+
+    def excluded(self, path: str) -> bool:
+        """
+        True if path (a string under the root, as produced by os.scandir) or any of its parents is excluded.
+        """
+        node = self._trie
+        if _END in node:
+            return True
+        for part in os.path.normcase(path[self._prefix_len:]).split(os.sep):
+            node = node.get(part)
+            if node is None:
+                return False
+            if _END in node:
+                return True
+        return False
+
+    def _pattern_match(self, path: str, name: str, suffix: str) -> bool:
+        if self._by_name is not None and self._by_name.fullmatch(name + suffix):
+            return True
+        if self._by_path is not None:
+            rel = path[self._prefix_len:]
+            if os.sep != "/":
+                rel = rel.replace(os.sep, "/")
+            return self._by_path.fullmatch(rel + suffix) is not None
+        return False
+
+    def skip_dir(self, path: str) -> bool:
+        if len(path) <= self._root_len:
+            return _END in self._trie  # the root itself is only excluded literally
+        return self.excluded(path) or self._pattern_match(path, path[path.rfind(os.sep) + 1:], "/")
+
+    def skip_file(self, path: str, name: str) -> bool:
+        return self.excluded(path) or self._pattern_match(path, name, "")
@@ -0,0 +1,163 @@
+import errno
+import os
+import sys
+from threading import Lock
+from typing import BinaryIO, Optional
+
+from src.throttle import Throttle
+
+# strategy names reported in Stats
+CLONE = "clone"
+WIN32 = "CopyFileW"
+COPY_FILE_RANGE = "copy_file_range"
+SENDFILE = "sendfile"
+BUFFERED = "buffered"
+RESUMED = "resumed"
+
+PARTIAL_SUFFIX = ".bkpart"  # content being written; renamed over the destination when complete
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int), Linux reflink ioctl
+_CHUNK = 8 * 1024 * 1024  # per-call size for the kernel copy loops
+_ALIGN = 64 * 1024
+_VERIFY_SIZE = 1024 * 1024  # tail of a partial file compared with the source before resuming
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOTTY,
+                    errno.EBADF, errno.EPERM}
+
+# (strategy, src device, dst device) pairs the kernel has refused; not retried
+_refused: set[tuple[str, int, int]] = set()
+_refused_lock = Lock()
+
+
+def _refuse(strategy: str, devs: tuple[int, int]) -> None:
+    with _refused_lock:
+        _refused.add((strategy, *devs))
+
+
+def _allowed(strategy: str, devs: tuple[int, int]) -> bool:
+    return (strategy, *devs) not in _refused
+
+
+def _clone(fsrc: BinaryIO, fdst: BinaryIO) -> None:
+    import fcntl
+    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def _kernel_loop(fsrc: BinaryIO, fdst: BinaryIO, size: int, use_sendfile: bool,
+                 throttle: Optional[Throttle], start: int = 0) -> bool:
+    """
+    Copy bytes from start on with copy_file_range/sendfile. False if the kernel
+    refused before any byte was moved.
+    """
+    infd, outfd = fsrc.fileno(), fdst.fileno()
+    offset = start
+    while offset < size:
+        count = min(_CHUNK, size - offset)
+        if throttle is not None:
+            throttle.bytes(count)
+        try:
+            if use_sendfile:
+                n = os.sendfile(outfd, infd, offset, count)
+            else:
+                n = os.copy_file_range(infd, outfd, count, offset, offset)
+        except OSError as exc:
+            if offset == start and exc.errno in _FALLBACK_ERRNOS:
+                return False
+            raise
+        if n == 0:
+            if offset == start:
+                return False  # some filesystems report 0 instead of an error
+            break  # source shrank while copying
+        offset += n
+    return True
+
+
+def _buffered(fsrc: BinaryIO, fdst: BinaryIO, buf_size: int, throttle: Optional[Throttle]) -> None:
+    buf = bytearray(-(-buf_size // _ALIGN) * _ALIGN)
+    view = memoryview(buf)
+    readinto, write = fsrc.readinto, fdst.write
+    while n := readinto(buf):
+        if throttle is not None:
+            throttle.bytes(n)
+        write(view[:n])
+
+
+def copy_content(src: str, dst: str, buf_size: Optional[int] = None,
+                 throttle: Optional[Throttle] = None) -> str:
+    """
+    Copy file content from src to dst (created or truncated) with the cheapest
+    mechanism the platform and filesystems allow, in this order: reflink clone,
+    CopyFileW on Windows, copy_file_range, sendfile, then an aligned userspace buffer.
+    Strategies that a pair of devices refused once are skipped for later files.
+
+    Returns:
+        Name of the strategy that did the copy.
+    """
+    limited = throttle is not None and throttle.limits_bytes
+    if sys.platform == "win32" and not limited:
+        import ctypes
+        if not ctypes.windll.kernel32.CopyFileW(src, dst, False):
+            raise ctypes.WinError()
+        return WIN32
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        st = os.fstat(fsrc.fileno())
+        devs = (st.st_dev, os.fstat(fdst.fileno()).st_dev)
+        if sys.platform.startswith("linux") and st.st_size and _allowed(CLONE, devs):
+            try:
+                _clone(fsrc, fdst)
+                return CLONE
+            except OSError as exc:
+                if exc.errno not in _FALLBACK_ERRNOS:
+                    raise
+                _refuse(CLONE, devs)
+        for strategy, available in ((COPY_FILE_RANGE, hasattr(os, "copy_file_range")),
+                                    (SENDFILE, hasattr(os, "sendfile") and sys.platform.startswith("linux"))):
+            if available and st.st_size and _allowed(strategy, devs):
+                if _kernel_loop(fsrc, fdst, st.st_size, strategy == SENDFILE, throttle):
+                    return strategy
+                _refuse(strategy, devs)
+                fdst.seek(0)
+                fdst.truncate()
+        _buffered(fsrc, fdst, buf_size or _CHUNK, throttle)
+        return BUFFERED
+
+
+def _verified_offset(src: str, partial: str) -> int:
+    """
+    Length of partial if its last block matches src at the same offset, else 0.
+    """
+    try:
+        done = os.path.getsize(partial)
+    except FileNotFoundError:
+        return 0
+    if not done or done > os.path.getsize(src):
+        return 0
+    n = min(done, _VERIFY_SIZE)
+    with open(src, "rb") as fs, open(partial, "rb") as fp:
+        fs.seek(done - n)
+        fp.seek(done - n)
+        return done if fs.read(n) == fp.read(n) else 0
+
+
+def resume_content(src: str, partial: str, buf_size: Optional[int] = None,
+                   throttle: Optional[Throttle] = None) -> str:
+    """
+    Like copy_content into partial, but if partial already holds a verified
+    prefix of src (left by an interrupted run), copy only the rest.
+
+    Returns:
+        Name of the strategy used, RESUMED if a prefix was kept.
+    """
+    done = _verified_offset(src, partial)
+    if not done:
+        return copy_content(src, partial, buf_size, throttle)
+    with open(src, "rb") as fsrc, open(partial, "r+b") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        fdst.truncate(done)
+        fdst.seek(done)
+        if not (hasattr(os, "copy_file_range")
+                and _kernel_loop(fsrc, fdst, size, False, throttle, start=done)):
+            fsrc.seek(done)
+            fdst.seek(done)
+            _buffered(fsrc, fdst, buf_size or _CHUNK, throttle)
+    return RESUMED
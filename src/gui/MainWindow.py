@@ -50,6 +50,7 @@ class MainWindow(QtWidgets.QMainWindow):
             (_("– Delete"), self._delete_source),
             (_("Clear"), self._clear_sources),
             (_("Exclusions"), self._edit_excludes),
+            (_("Patterns"), self._edit_patterns),
         ]:
             btn = QtWidgets.QPushButton(text)
             btn.clicked.connect(handler)
@@ -187,6 +188,8 @@ class MainWindow(QtWidgets.QMainWindow):
         self.lbl_excl.setText(_("Exclusions for: {source}").format(source=source))
         for excl in self.cfg.sources[row].excludes:
             self.lst_excl.addItem(excl)
+        for pattern in self.cfg.sources[row].patterns:
+            self.lst_excl.addItem(_("Pattern: {pattern}").format(pattern=pattern))
 
     def _edit_excludes(self):
         dialog = ExcludeDialog(self.cfg, self)
@@ -197,6 +200,27 @@ class MainWindow(QtWidgets.QMainWindow):
             self._refresh_excludes()
             self._update_backup_size()
 
+    def _edit_patterns(self):
+        row = self.lst_src.currentRow()
+        if row < 0:
+            return
+        rule = self.cfg.sources[row]
+        text, ok = QtWidgets.QInputDialog.getMultiLineText(
+            self,
+            _("Exclusion patterns"),
+            _("One gitignore-style pattern per line (e.g. Cache/, *.tmp, **/GPUCache/):"),
+            "\n".join(rule.patterns),
+        )
+        if ok:
+            patterns = [line.strip() for line in text.splitlines() if line.strip()]
+            if any(p.startswith("!") for p in patterns):
+                QtWidgets.QMessageBox.warning(
+                    self, _("Error"), _("Negated patterns (starting with \"!\") are not supported"))
+                return
+            rule.patterns = patterns
+            self._refresh_excludes()
+            self._update_backup_size()
+
     def _save(self):
         target = self.le_target.text().strip()
         if not target:
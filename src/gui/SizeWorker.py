@@ -3,7 +3,7 @@ from pathlib import Path
 from PySide6 import QtCore
 
 from src.config import PathRule
-from src.utils import dir_size
+from src.utils import dir_size, iter_entries
 
 
 class SizeWorker(QtCore.QThread):
@@ -19,6 +19,10 @@ class SizeWorker(QtCore.QThread):
             root = Path(rule.source).expanduser().resolve()
             if not root.exists():
                 continue
+            if rule.patterns:
+                # patterns can match anywhere, so the tree is walked as a backup would
+                total += sum(f.size or 0 for f in iter_entries(rule))
+                continue
             root_sz = dir_size(root)
             for ex in rule.excludes:
                 ex_path = root / ex
@@ -0,0 +1,180 @@
+import hashlib
+import io
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, NamedTuple
+
+from src.config import CONFIG_FILE
+
+DIGEST_CACHE_FILE = CONFIG_FILE.parent / "digests.sqlite"
+DEFAULT_ALGORITHM = "sha1"
+_BUF_SIZE = io.DEFAULT_BUFFER_SIZE * 32
+
+
+def _optional_algorithms() -> Dict[str, Callable[[], Any]]:
+    found: Dict[str, Callable[[], Any]] = {}
+    try:
+        import xxhash
+
+        found["xxh3_128"] = xxhash.xxh3_128
+        found["xxh64"] = xxhash.xxh64
+    except ImportError:
+        pass
+    try:
+        import blake3
+
+        found["blake3"] = blake3.blake3
+    except ImportError:
+        pass
+    return found
+
+
+# name -> factory of objects with update()/hexdigest(); the stdlib ones go
+# through hashlib.file_digest, which hashes outside the GIL
+ALGORITHMS: Dict[str, Callable[[], Any]] = {
+    "sha1": hashlib.sha1,
+    "md5": hashlib.md5,
+    "blake2b": hashlib.blake2b,
+    "blake2s": hashlib.blake2s,
+    **_optional_algorithms(),
+}
+
+
+def file_digest(path: str | Path, algorithm: str = DEFAULT_ALGORITHM, buf_size: int = _BUF_SIZE) -> str:
+    """
+    Digest of a file tagged with its algorithm (``"blake2b:…"``), so digests
+    made with different algorithms never compare equal.
+
+    Raises:
+        KeyError: if the algorithm is unknown or its package is not installed.
+    """
+    factory = ALGORITHMS[algorithm]
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest") and algorithm in hashlib.algorithms_available:
+            h = hashlib.file_digest(f, factory, _bufsize=buf_size)
+        else:
+            h = factory()
+            buf = bytearray(buf_size)
+            view = memoryview(buf)
+            while n := f.readinto(buf):
+                h.update(view[:n])
+    return f"{algorithm}:{h.hexdigest()}"
+
+
+def sampled_digest(path: str | Path, algorithm: str = DEFAULT_ALGORITHM,
+                   blocks: int = 16, block_size: int = 64 * 1024) -> str:
+    """
+    Digest of the file size plus its head, tail and ``blocks`` evenly spaced
+    blocks: a cheap check for large files that catches in-place rewrites which
+    keep size and mtime. Small files are hashed whole.
+    """
+    h = ALGORITHMS[algorithm]()
+    with open(path, "rb") as f:
+        size = f.seek(0, io.SEEK_END)
+        h.update(size.to_bytes(8, "little"))
+        if size <= (blocks + 2) * block_size:
+            f.seek(0)
+            h.update(f.read())
+        else:
+            last = size - block_size
+            for i in range(blocks + 2):
+                f.seek(last * i // (blocks + 1))
+                h.update(f.read(block_size))
+    return f"{algorithm}-sample{blocks}:{h.hexdigest()}"
+
+
+class _CachedDigest(NamedTuple):
+    size: int
+    mtime_ns: int
+    ino: int
+    digest: str
+
+
+class DigestCache:
+    """
+    Persistent source-file digests keyed on path and validated by size, mtime,
+    file id and algorithm, so a file is only re-read when its metadata changes.
+    """
+
+    def __init__(self, path: Path = DIGEST_CACHE_FILE, algorithm: str = DEFAULT_ALGORITHM):
+        self.path = path
+        self.algorithm = algorithm
+        self._tag = algorithm + ":"
+        self._entries: Dict[str, _CachedDigest] = {}
+        self._dirty: Dict[str, _CachedDigest] = {}
+        self._lock = Lock()
+
+    @classmethod
+    def load(cls, path: Path = DIGEST_CACHE_FILE, algorithm: str = DEFAULT_ALGORITHM) -> "DigestCache":
+        cache = cls(path, algorithm)
+        if not path.exists():
+            return cache
+        try:
+            with closing(sqlite3.connect(path)) as con:
+                rows = con.execute("SELECT path, size, mtime_ns, ino, digest FROM digests")
+                cache._entries = {r[0]: _CachedDigest(*r[1:]) for r in rows}
+        except sqlite3.DatabaseError:
+            cache._entries = {}
+        return cache
+
+    def digest(self, path: str, size: int, mtime_ns: int, ino: int = 0, refresh: bool = False) -> str:
+        """
+        Digest of the file at path, computed only if the cached one is stale
+        or ``refresh`` is set.
+
+        Raises:
+            OSError: if the file has to be read and cannot be.
+        """
+        cached = self._entries.get(path)
+        if (not refresh and cached is not None and cached[:3] == (size, mtime_ns, ino)
+                and cached.digest.startswith(self._tag)):
+            return cached.digest
+        entry = _CachedDigest(size, mtime_ns, ino, file_digest(path, self.algorithm))
+        with self._lock:
+            self._entries[path] = entry
+            self._dirty[path] = entry
+        return entry.digest
+
+    def save(self) -> None:
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self.path)) as con, con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS digests ("
+                "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+                "ino INTEGER NOT NULL, digest TEXT NOT NULL)"
+            )
+            con.executemany(
+                "INSERT OR REPLACE INTO digests (path, size, mtime_ns, ino, digest) VALUES (?, ?, ?, ?, ?)",
+                [(k, *e) for k, e in dirty.items()],
+            )
+
+
+if __name__ == "__main__":
+    # Throughput benchmark: python -m src.hashing
+    import os
+    import tempfile
+    import time
+
+    with tempfile.TemporaryDirectory() as tmp:
+        large = Path(tmp) / "large.bin"
+        large.write_bytes(os.urandom(256 * 1024 * 1024))
+        small = [Path(tmp) / f"small_{i}.bin" for i in range(5000)]
+        for p in small:
+            p.write_bytes(os.urandom(4096))
+
+        print(f"{'algorithm':<10} {'large MB/s':>12} {'small files/s':>15}")
+        for name in ALGORITHMS:
+            t = time.perf_counter()
+            file_digest(large, name)
+            large_rate = large.stat().st_size / (time.perf_counter() - t) / 2 ** 20
+            t = time.perf_counter()
+            for p in small:
+                file_digest(p, name)
+            small_rate = len(small) / (time.perf_counter() - t)
+            print(f"{name:<10} {large_rate:>12.0f} {small_rate:>15.0f}")
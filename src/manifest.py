@@ -0,0 +1,115 @@
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from threading import Lock
+from typing import Collection, Dict, List, NamedTuple, Optional, Set
+
+MANIFEST_NAME = ".backup_manifest.sqlite"
+
+# column -> type; columns added after the first release are appended to
+# existing manifests on save
+_COLUMNS = {
+    "size": "INTEGER NOT NULL",
+    "mtime_ns": "INTEGER NOT NULL",
+    "digest": "TEXT",
+    "sample": "TEXT",
+    "verified": "REAL",
+    "chunks": "BLOB",
+    "stored": "INTEGER",
+}
+
+
+class ManifestEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    digest: Optional[str] = None
+    sample: Optional[str] = None  # sampled digest of large files
+    verified: Optional[float] = None  # unix time of the last full-digest comparison
+    chunks: Optional[bytes] = None  # delta-copy chunk map of large files
+    stored: Optional[int] = None  # bytes on the target when written compressed, else None
+
+
+class Manifest:
+    """
+    Per-target record of what previous runs wrote, keyed by the path relative
+    to the target root. Loaded into memory once, so unchanged files can be
+    recognised from source stats alone without touching the target drive.
+    """
+
+    def __init__(self, root: Path):
+        self.path = root / MANIFEST_NAME
+        self._entries: Dict[str, ManifestEntry] = {}
+        self._dirty: Dict[str, ManifestEntry] = {}
+        self._removed: Set[str] = set()
+        self._lock = Lock()
+
+    @classmethod
+    def load(cls, root: Path) -> "Manifest":
+        manifest = cls(root)
+        if not manifest.path.exists():
+            return manifest
+        try:
+            with closing(sqlite3.connect(manifest.path)) as con:
+                present = {r[1] for r in con.execute("PRAGMA table_info(files)")}
+                cols = ", ".join(c if c in present else "NULL" for c in _COLUMNS)
+                rows = con.execute(f"SELECT path, {cols} FROM files")
+                manifest._entries = {r[0]: ManifestEntry(*r[1:]) for r in rows}
+        except sqlite3.DatabaseError:
+            manifest._entries = {}
+        return manifest
+
+    def keys(self) -> List[str]:
+        return sorted(self._entries)
+
+    def get(self, key: str) -> Optional[ManifestEntry]:
+        return self._entries.get(key)
+
+    def matches(self, key: str, size: int, mtime_ns: int) -> bool:
+        """
+        True if the file was last written from a source with exactly this size and mtime.
+        """
+        entry = self._entries.get(key)
+        return entry is not None and entry.size == size and entry.mtime_ns == mtime_ns
+
+    def put(self, key: str, entry: ManifestEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._dirty[key] = entry
+            self._removed.discard(key)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty.pop(key, None)
+                self._removed.add(key)
+
+    def save(self, hold: Collection[str] = ()) -> None:
+        """
+        Persist entries recorded or removed since the last save in a single
+        transaction. Entries recorded for keys in hold stay unsaved until a
+        later save.
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            removed, self._removed = self._removed, set()
+            for key in hold:
+                if key in dirty:
+                    self._dirty[key] = dirty.pop(key)
+        if not dirty and not removed:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self.path)) as con, con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, "
+                + ", ".join(f"{c} {t}" for c, t in _COLUMNS.items()) + ")"
+            )
+            present = {r[1] for r in con.execute("PRAGMA table_info(files)")}
+            for c, t in _COLUMNS.items():
+                if c not in present:
+                    con.execute(f"ALTER TABLE files ADD COLUMN {c} {t.replace(' NOT NULL', '')}")
+            con.executemany("DELETE FROM files WHERE path = ?", [(k,) for k in removed])
+            con.executemany(
+                f"INSERT OR REPLACE INTO files (path, {', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(_COLUMNS) + 1))})",
+                [(k, *e) for k, e in dirty.items()],
+            )
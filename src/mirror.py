@@ -0,0 +1,86 @@
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+from src.compress import COMPRESSED_SUFFIX
+from src.utils import walk_files
+
+
+def sorted_orphans(target: Iterable[str], source: Iterable[str]) -> Iterator[str]:
+    """
+    Keys present in target but not in source, from one merge pass over two
+    ascending key sequences.
+    """
+    src = iter(source)
+    current = next(src, None)
+    for key in target:
+        while current is not None and current < key:
+            current = next(src, None)
+        if current != key:
+            yield key
+
+
+def fold_key(key: str) -> str:
+    """
+    Key as the target filesystem compares names: case-folded on Windows.
+    """
+    return os.path.normcase(key)
+
+
+def split_case_aliases(orphans: List[str], live: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split orphans into real ones and aliases, which differ from a live key
+    only in case: on a case-insensitive target they name a live file (a
+    source folder renamed from Foo to foo still mirrors into Foo).
+
+    Returns:
+        (orphans, aliases)
+    """
+    if fold_key("A") == "A":
+        return orphans, []
+    folded = {fold_key(k) for k in live}
+    real: List[str] = []
+    aliases: List[str] = []
+    for key in orphans:
+        (aliases if fold_key(key) in folded else real).append(key)
+    return real, aliases
+
+
+def target_keys(root: Path, skip_top: Iterable[str], workers: int) -> List[str]:
+    """
+    Sorted manifest-style keys ('/'-separated, relative to root) of every file
+    in the target mirror, compressed files under their original name; top-level
+    entries named in skip_top (the tool's own stores) are left out.
+    """
+    root_str = str(root)
+    prefix_len = len(root_str) if root_str.endswith(os.sep) else len(root_str) + 1
+    skip = {os.path.join(root_str, name) for name in skip_top}
+    keys = []
+    for entry in walk_files(root_str, workers, skip_dir=skip.__contains__):
+        if entry.path in skip:
+            continue
+        key = entry.path[prefix_len:].replace(os.sep, "/")
+        keys.append(key[:-len(COMPRESSED_SUFFIX)] if key.endswith(COMPRESSED_SUFFIX) else key)
+    keys.sort()
+    return keys
+
+
+def remove_empty_dirs(dirs: Iterable[str], root: str) -> int:
+    """
+    Remove each of dirs and then its ancestors below root, as long as they are empty.
+
+    Returns:
+        Number of directories removed.
+    """
+    removed = 0
+    done = set()
+    for d in sorted(set(dirs), key=len, reverse=True):
+        while d not in done and len(d) > len(root) and d.startswith(root):
+            done.add(d)
+            try:
+                os.rmdir(d)
+            except OSError:
+                break  # not empty (or gone): its ancestors aren't empty either
+            removed += 1
+            d = os.path.dirname(d)
+    return removed
@@ -0,0 +1,243 @@
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from threading import Lock
+from typing import Any, BinaryIO, Dict, NamedTuple, Optional, Set
+
+PACK_DIR = ".backup_pack"
+_INDEX_NAME = "index.sqlite"
+_SEGMENT_SUFFIX = ".seg"
+_COMPACT_RATIO = 0.5  # share of dead bytes in the segments above which the pack is compacted
+
+
+class PackRecord(NamedTuple):
+    segment: int
+    offset: int
+    size: int  # bytes stored in the segment, the file as it is
+    mtime_ns: int
+    mode: int
+
+
+def _segment_path(pack_dir: Path, segment: int) -> Path:
+    return pack_dir / f"{segment:05d}{_SEGMENT_SUFFIX}"
+
+
+def _load_index(pack_dir: Path) -> Dict[str, PackRecord]:
+    path = pack_dir / _INDEX_NAME
+    if not path.exists():
+        return {}
+    try:
+        with closing(sqlite3.connect(path)) as con:
+            rows = con.execute("SELECT path, segment, offset, size, mtime_ns, mode FROM files")
+            return {r[0]: PackRecord(*r[1:]) for r in rows}
+    except sqlite3.DatabaseError:
+        return {}
+
+
+class PackStore:
+    """
+    Small files appended to rolling segment files under ``.backup_pack`` in the
+    target root, with an index of where each one lives. Saves a cluster
+    allocation and a directory update per file on filesystems like exFAT.
+
+    Segments are append-only: a changed file is stored again and the index
+    moves to the new copy. The old bytes stay until ``compact`` rewrites the
+    live files into fresh segments, which a run does once they make up more
+    than half of the pack.
+    """
+
+    def __init__(self, root: Path, segment_size: int):
+        self.dir = root / PACK_DIR
+        self.segment_size = segment_size
+        self._index: Dict[str, PackRecord] = {}
+        self._dirty: Dict[str, PackRecord] = {}
+        self._removed: Set[str] = set()
+        self._segment = 0
+        self._out: Optional[BinaryIO] = None
+        self._offset = 0
+        self._stored = 0  # bytes in all segments, live or not
+        self._lock = Lock()
+
+    @classmethod
+    def load(cls, root: Path, segment_size: int) -> "PackStore":
+        store = cls(root, segment_size)
+        store._index = _load_index(store.dir)
+        numbers = store._segments()
+        store._segment = max(numbers, default=0)
+        store._stored = sum(_segment_path(store.dir, n).stat().st_size for n in numbers)
+        return store
+
+    def _segments(self) -> list[int]:
+        if not self.dir.is_dir():
+            return []
+        return sorted(int(p.stem) for p in self.dir.glob("*" + _SEGMENT_SUFFIX) if p.stem.isdigit())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def matches(self, key: str, size: int, mtime_ns: int) -> bool:
+        rec = self._index.get(key)
+        return rec is not None and rec.size == size and rec.mtime_ns == mtime_ns
+
+    def _open(self, segment: int) -> None:
+        # called with the lock held
+        if self._out is not None:
+            self._out.flush()
+            os.fsync(self._out.fileno())
+            self._out.close()
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._segment = segment
+        self._out = open(_segment_path(self.dir, segment), "ab")
+        self._offset = self._out.tell()
+
+    def add(self, key: str, src: str, hasher: Any = None) -> None:
+        """
+        Append the content of src to the current segment and index it under key,
+        feeding it to hasher (an object with update()) when given.
+        """
+        with open(src, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+        if hasher is not None:
+            hasher.update(data)
+        with self._lock:
+            if self._out is None:
+                self._open(max(self._segment, 1))  # continue the last segment of the previous run
+            if self._offset and self._offset + len(data) > self.segment_size:
+                self._open(self._segment + 1)
+            self._out.write(data)
+            rec = PackRecord(self._segment, self._offset, len(data), st.st_mtime_ns, st.st_mode)
+            self._offset += len(data)
+            self._stored += len(data)
+            self._index[key] = self._dirty[key] = rec
+            self._removed.discard(key)
+
+    def discard(self, key: str) -> None:
+        """
+        Forget key, e.g. because the file is stored as a plain mirror again.
+        """
+        with self._lock:
+            if self._index.pop(key, None) is not None:
+                self._dirty.pop(key, None)
+                self._removed.add(key)
+
+    def close(self) -> None:
+        """
+        Flush the open segment and persist index changes in a single transaction.
+        """
+        with self._lock:
+            if self._out is not None:
+                self._out.flush()
+                os.fsync(self._out.fileno())
+                self._out.close()
+                self._out = None
+            dirty, self._dirty = self._dirty, {}
+            removed, self._removed = self._removed, set()
+        if not dirty and not removed:
+            return
+        try:
+            self._commit(dirty, removed)
+        except BaseException:
+            with self._lock:  # keep the changes for the next close, unless superseded meanwhile
+                self._dirty = {**{k: r for k, r in dirty.items() if k not in self._removed}, **self._dirty}
+                self._removed = (removed | self._removed) - self._dirty.keys()
+            raise
+
+    def uncommitted(self) -> Set[str]:
+        """
+        Keys stored since the last successful close, which the index doesn't know yet.
+        """
+        with self._lock:
+            return set(self._dirty)
+
+    def _commit(self, dirty: Dict[str, PackRecord], removed: Set[str]) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self.dir / _INDEX_NAME)) as con, con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, segment INTEGER NOT NULL, "
+                "offset INTEGER NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, mode INTEGER NOT NULL)"
+            )
+            con.executemany("DELETE FROM files WHERE path = ?", [(k,) for k in removed])
+            con.executemany(
+                "INSERT OR REPLACE INTO files (path, segment, offset, size, mtime_ns, mode) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(k, *r) for k, r in dirty.items()],
+            )
+
+    def compact(self, max_dead_ratio: float = _COMPACT_RATIO) -> int:
+        """
+        If more than max_dead_ratio of the segment bytes belong to files that
+        changed or left the pack since they were stored, copy the live files
+        into new segments, commit the index and delete the old segments. An
+        interruption leaves the old segments in place, still valid for the
+        committed index.
+
+        Returns:
+            Bytes reclaimed, 0 if the pack was left as it is.
+        """
+        self.close()
+        with self._lock:
+            dead = self._stored - sum(r.size for r in self._index.values())
+            if dead <= 0 or dead <= self._stored * max_dead_ratio:
+                return 0
+            old = self._segments()
+            self._segment = max(old, default=0)
+            moved: Dict[str, PackRecord] = {}
+            segment, seg = None, None
+            try:
+                for key, rec in sorted(self._index.items(), key=lambda kr: (kr[1].segment, kr[1].offset)):
+                    if rec.segment != segment:
+                        if seg is not None:
+                            seg.close()
+                        segment, seg = rec.segment, open(_segment_path(self.dir, rec.segment), "rb")
+                    seg.seek(rec.offset)
+                    data = seg.read(rec.size)
+                    if self._out is None or (self._offset and self._offset + len(data) > self.segment_size):
+                        self._open(self._segment + 1)
+                    self._out.write(data)
+                    moved[key] = rec._replace(segment=self._segment, offset=self._offset)
+                    self._offset += len(data)
+            finally:
+                if seg is not None:
+                    seg.close()
+            self._index.update(moved)
+            self._dirty.update(moved)
+            self._stored -= dead
+        self.close()
+        for number in old:
+            _segment_path(self.dir, number).unlink(missing_ok=True)
+        return dead
+
+
+def extract(root: Path, dest: Path, prefix: str = "") -> int:
+    """
+    Write every packed file of the target root (optionally only those whose
+    key starts with prefix) below dest, restoring timestamps and mode.
+
+    Returns:
+        Number of files written.
+    """
+    pack_dir = root / PACK_DIR
+    records = sorted(((k, r) for k, r in _load_index(pack_dir).items() if k.startswith(prefix)),
+                     key=lambda kr: (kr[1].segment, kr[1].offset))
+    written = 0
+    segment, seg = None, None
+    try:
+        for key, rec in records:
+            if rec.segment != segment:
+                if seg is not None:
+                    seg.close()
+                segment, seg = rec.segment, open(_segment_path(pack_dir, rec.segment), "rb")
+            seg.seek(rec.offset)
+            data = seg.read(rec.size)
+            out = dest / key
+            out.parent.mkdir(parents=True, exist_ok=True)
+            out.write_bytes(data)
+            os.chmod(out, rec.mode & 0o7777)
+            os.utime(out, ns=(rec.mtime_ns, rec.mtime_ns))
+            written += 1
+    finally:
+        if seg is not None:
+            seg.close()
+    return written
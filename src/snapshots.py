@@ -0,0 +1,118 @@
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+SNAPSHOT_DIR = "snapshots"
+_NAME_FORMAT = "%Y-%m-%d_%H%M%S"
+
+
+def _parse(name: str) -> Optional[Tuple[datetime, int]]:
+    # "<timestamp>" or "<timestamp>.<n>" for the n-th snapshot taken within the same second
+    stamp, _, seq = name.partition(".")
+    if seq and not seq.isdigit():
+        return None
+    try:
+        return datetime.strptime(stamp, _NAME_FORMAT), int(seq or 1)
+    except ValueError:
+        return None
+
+
+def list_snapshots(root: Path) -> List[Tuple[datetime, Path]]:
+    """
+    Snapshots under the target root, oldest first.
+    """
+    base = root / SNAPSHOT_DIR
+    if not base.is_dir():
+        return []
+    found = []
+    with os.scandir(base) as it:
+        for e in it:
+            if e.is_dir(follow_symlinks=False) and (parsed := _parse(e.name)) is not None:
+                found.append((*parsed, Path(e.path)))
+    return [(ts, path) for ts, _seq, path in sorted(found)]
+
+
+def new_snapshot(root: Path, now: Optional[datetime] = None) -> Tuple[Path, Optional[Path]]:
+    """
+    Create the directory for a new snapshot. A run started within the same
+    second as an earlier one (e.g. logon and unlock triggers) gets a numbered
+    name instead of writing into the earlier snapshot.
+
+    Returns:
+        (new snapshot, the latest previous one or None)
+    """
+    existing = list_snapshots(root)
+    stamp = (now or datetime.now()).strftime(_NAME_FORMAT)
+    base = root / SNAPSHOT_DIR
+    base.mkdir(parents=True, exist_ok=True)
+    seq = 1
+    while True:
+        path = base / (stamp if seq == 1 else f"{stamp}.{seq}")
+        try:
+            path.mkdir()
+            break
+        except FileExistsError:
+            seq += 1
+    previous = existing[-1][1] if existing else None
+    return path, previous
+
+
+def hardlinks_supported(directory: Path) -> bool:
+    """
+    True if files in directory can be hardlinked; exFAT and FAT, common on SD
+    cards, can't, and every snapshot is then a full copy.
+    """
+    probe = directory / f".{uuid.uuid4().hex}.tmp"
+    link = Path(f"{probe}.link")
+    try:
+        probe.touch()
+        os.link(probe, link)
+        return True
+    except OSError:
+        return False
+    finally:
+        link.unlink(missing_ok=True)
+        probe.unlink(missing_ok=True)
+
+
+def select_keep(stamps: Iterable[datetime], keep_daily: int, keep_weekly: int) -> Set[datetime]:
+    """
+    Snapshots a retention policy keeps: the latest of each of the last
+    keep_daily days and of each of the last keep_weekly ISO weeks that have
+    one, plus the newest snapshot overall.
+    """
+    newest_first = sorted(stamps, reverse=True)
+    keep: Set[datetime] = set(newest_first[:1])
+    days: Set[object] = set()
+    weeks: Set[object] = set()
+    for ts in newest_first:
+        day, week = ts.date(), ts.isocalendar()[:2]
+        if day not in days and len(days) < keep_daily:
+            days.add(day)
+            keep.add(ts)
+        if week not in weeks and len(weeks) < keep_weekly:
+            weeks.add(week)
+            keep.add(ts)
+    return keep
+
+
+def prune(root: Path, keep_daily: int, keep_weekly: int) -> List[Path]:
+    """
+    Delete the snapshots the retention policy doesn't keep. Content shared
+    with newer snapshots survives through their hardlinks, so this only
+    unlinks names.
+
+    Returns:
+        The removed snapshot directories.
+    """
+    snaps = list_snapshots(root)
+    keep = select_keep((ts for ts, _p in snaps), keep_daily, keep_weekly)
+    removed = []
+    for ts, path in snaps:
+        if ts not in keep:
+            shutil.rmtree(path)
+            removed.append(path)
+    return removed
@@ -0,0 +1,50 @@
+import time
+from threading import Lock
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Callers may take more tokens than are available;
+    the bucket goes into debt and the caller sleeps it off, so one large
+    request is paced instead of rejected.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self, n: float = 1) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= n
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Throttle:
+    """
+    Byte and file rate limits shared by all copy workers; 0 means unlimited.
+    """
+
+    def __init__(self, bytes_per_sec: int = 0, files_per_sec: int = 0):
+        self._bytes = TokenBucket(bytes_per_sec) if bytes_per_sec > 0 else None
+        self._files = TokenBucket(files_per_sec) if files_per_sec > 0 else None
+
+    @property
+    def limits_bytes(self) -> bool:
+        return self._bytes is not None
+
+    def file(self) -> None:
+        if self._files is not None:
+            self._files.acquire(1)
+
+    def bytes(self, n: int) -> None:
+        if self._bytes is not None:
+            self._bytes.acquire(n)
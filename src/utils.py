@@ -1,72 +1,149 @@
 import ctypes
-import hashlib
-import io
+import glob
 import math
 import os
+import re
 import shutil
 import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from pathlib import Path
-from typing import Final
+from queue import SimpleQueue
+from threading import Lock, Thread
+from typing import Callable, Final, Iterator, Optional
 from typing import Iterable
 
 from src.config import PathRule
+from src.excludes import ExcludeMatcher
+from src.fastcopy import PARTIAL_SUFFIX, copy_content, resume_content
+from src.throttle import Throttle
 
 _MTIME_TOLERANCE: Final[float] = 2.0
+SCAN_WORKERS: Final[int] = 8
+_PARTIAL_NAME: Final[re.Pattern] = re.compile(r"\.[0-9a-f]+-[0-9a-f]+" + re.escape(PARTIAL_SUFFIX))
 
 
-def sha1(path: Path, buf_size: int = io.DEFAULT_BUFFER_SIZE * 16) -> str:
+def _stat_matches(size: int, mtime: float, ds: os.stat_result) -> bool:
+    return size == ds.st_size and math.isclose(mtime, ds.st_mtime, abs_tol=_MTIME_TOLERANCE)
+
+
+class TargetIndex:
     """
-    Compute SHA-1 digest of a file, using file_digest if available.
+    Batched view of the target tree for change detection: every target
+    directory is listed once with scandir and its files are looked up by name,
+    instead of exists() + stat() round-trips per file. Directories are kept in a
+    small LRU, which suffices because the walker yields files directory by
+    directory. Not thread-safe; meant for the single compare stage.
     """
-    try:
-        return hashlib.file_digest(path, 'sha1', buf_size).hex()
-    except AttributeError:
-        h = hashlib.sha1()
-        with path.open('rb') as f:
-            while chunk := f.read(buf_size):
-                h.update(chunk)
-        return h.hexdigest()
 
+    def __init__(self, max_dirs: int = 64):
+        self._max_dirs = max_dirs
+        self._dirs: OrderedDict[str, dict[str, os.DirEntry]] = OrderedDict()
 
-def same_file(src: Path, dst: Path, use_hash: bool = False) -> bool:
-    """
-    Returns True if the destination file exists, has the same size,
-    and similar modification time (within tolerance). Optionally compares
-    SHA-1 hashes if `use_hash` is True.
+    def _listing(self, directory: str) -> dict[str, os.DirEntry]:
+        listing = self._dirs.get(directory)
+        if listing is not None:
+            self._dirs.move_to_end(directory)
+            return listing
+        listing = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False):
+                        listing[os.path.normcase(entry.name)] = entry
+        except OSError:
+            pass
+        self._dirs[directory] = listing
+        if len(self._dirs) > self._max_dirs:
+            self._dirs.popitem(last=False)
+        return listing
 
-    This avoids false positives from timestamp rounding on filesystems like exFAT.
+    def stat(self, path: str) -> Optional[os.stat_result]:
+        """
+        Stat of the file at path, or None if it does not exist.
+        """
+        directory, name = os.path.split(path)
+        entry = self._listing(directory).get(os.path.normcase(name))
+        if entry is None:
+            return None
+        try:
+            return entry.stat(follow_symlinks=False)
+        except OSError:
+            return None
 
-    Args:
-        src (Path): Source file path.
-        dst (Path): Destination file path.
-        use_hash (bool): Whether to compare file hashes.
+    def same_file(self, dst: str, size: int, mtime_ns: int) -> bool:
+        """
+        True if dst exists with the given size and a modification time within
+        tolerance of mtime_ns, which avoids false negatives from timestamp
+        rounding on filesystems like exFAT.
+        """
+        ds = self.stat(dst)
+        return ds is not None and _stat_matches(size, mtime_ns / 1e9, ds)
 
-    Returns:
-        bool: True if files are considered identical.
+
+class DirCache:
+    """
+    Thread-safe set of directories known to exist on the target, so each one is
+    created (or found) with a single makedirs per run instead of per file.
     """
-    if not dst.exists():
-        return False
-    try:
-        ss = src.stat()
-        ds = dst.stat()
-    except OSError:
-        return False
-    if ss.st_size != ds.st_size:
-        return False
-    if not math.isclose(ss.st_mtime, ds.st_mtime, abs_tol=_MTIME_TOLERANCE):
-        return False
-    if use_hash:
-        return sha1(src) == sha1(dst)
-    return True
 
+    def __init__(self):
+        self._known: set[str] = set()
+        self._lock = Lock()
 
-def copy2(src: Path, dst: Path) -> None:
+    def ensure(self, directory: str) -> None:
+        if directory in self._known:
+            return
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            while directory not in self._known:
+                self._known.add(directory)
+                parent = os.path.dirname(directory)
+                if parent == directory:
+                    break
+                directory = parent
+
+
+def copy2(src: Path, dst: Path, buf_size: Optional[int] = None, throttle: Optional[Throttle] = None,
+          dirs: Optional[DirCache] = None, resumable: bool = False) -> str:
     """
-    Copy file metadata and content, creating parent dirs.
+    Copy file metadata and content, creating parent dirs (through dirs when
+    given). Content goes through the fastest engine available (see
+    fastcopy.copy_content) into a temporary file that is renamed over dst
+    once complete, so an interrupted copy never leaves a truncated dst.
+
+    With resumable, the temporary file is named after the source's size and
+    mtime and kept on failure, and a later copy of the same source version
+    continues where it stopped; partials of other versions are removed first.
+
+    Returns:
+        Name of the copy strategy used.
     """
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(src, dst, follow_symlinks=False)
+    if dirs is not None:
+        dirs.ensure(str(dst.parent))
+    else:
+        dst.parent.mkdir(parents=True, exist_ok=True)
+    if src.is_symlink():
+        shutil.copy2(src, dst, follow_symlinks=False)
+        return "symlink"
+    if resumable:
+        st = src.stat()
+        tmp = f"{dst}.{st.st_size:x}-{st.st_mtime_ns:x}{PARTIAL_SUFFIX}"
+        for stale in glob.glob(f"{glob.escape(str(dst))}.*-*{PARTIAL_SUFFIX}"):
+            if stale != tmp and _PARTIAL_NAME.fullmatch(stale, len(str(dst))):
+                Path(stale).unlink(missing_ok=True)
+        strategy = resume_content(str(src), tmp, buf_size, throttle)
+    else:
+        tmp = str(dst) + PARTIAL_SUFFIX
+        try:
+            strategy = copy_content(str(src), tmp, buf_size, throttle)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+    shutil.copystat(src, tmp, follow_symlinks=False)
+    os.replace(tmp, dst)  # also detaches dst from content it shared through hardlinks
+    return strategy
 
 
 def human_readable(size: int) -> str:
@@ -80,38 +157,183 @@ def human_readable(size: int) -> str:
     return f"{size:.2f} PB"
 
 
-def iter_files(rule: PathRule) -> Iterable[Path]:
+def _list_dir(path: str, unreadable: Optional[list[str]] = None) -> tuple[list[os.DirEntry], list[str]]:
+    """
+    Single scandir pass: file entries and subdirectory paths (symlinks are not followed).
+    Directories that can't be listed are appended to unreadable.
+    """
+    files: list[os.DirEntry] = []
+    dirs: list[str] = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(entry)
+    except FileNotFoundError:
+        pass
+    except PermissionError:
+        if unreadable is not None:
+            unreadable.append(path)
+    return files, dirs
+
+
+def walk_files(
+        root: str | Path,
+        workers: int = SCAN_WORKERS,
+        ordered: bool = False,
+        skip_dir: Optional[Callable[[str], bool]] = None,
+        unreadable: Optional[list[str]] = None,
+) -> Iterator[os.DirEntry]:
+    """
+    Yield file entries under root, listing directories on a pool of scandir workers.
+
+    Pending directories form one shared backlog that idle workers pull from, so deep
+    and wide subtrees balance across the pool; at most ``workers * 2`` listings are
+    in flight, keeping memory flat when the consumer is slower than the walk.
+
+    Args:
+        root: Directory to walk.
+        workers: Number of concurrent scandir calls; 1 walks in the calling thread.
+        ordered: Yield in a deterministic depth-first, name-sorted order (for tests).
+        skip_dir: Predicate on a directory path; matching directories are never listed.
+        unreadable: Collects directories skipped because they could not be listed.
+    """
+    root = str(root)
+    if skip_dir is not None and skip_dir(root):
+        return
+
+    def _children(dirs: list[str]) -> list[str]:
+        return [d for d in dirs if not skip_dir(d)] if skip_dir is not None else dirs
+
+    if workers <= 1 and not ordered:
+        stack = [root]
+        while stack:
+            files, dirs = _list_dir(stack.pop(), unreadable)
+            stack.extend(_children(dirs))
+            yield from files
+        return
+
+    if ordered:
+        # depth-first by name; listings of upcoming directories are prefetched
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            stack = [pool.submit(_list_dir, root, unreadable)]
+            while stack:
+                files, dirs = stack.pop().result()
+                files.sort(key=lambda e: e.name)
+                yield from files
+                stack.extend(pool.submit(_list_dir, d, unreadable) for d in sorted(_children(dirs), reverse=True))
+        return
+
+    work: SimpleQueue = SimpleQueue()
+    results: SimpleQueue = SimpleQueue()
+
+    def _worker() -> None:
+        while (d := work.get()) is not None:
+            try:
+                results.put(_list_dir(d, unreadable))
+            except BaseException as exc:
+                results.put(exc)
+
+    threads = [Thread(target=_worker, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    backlog = [root]
+    in_flight = 0
+    try:
+        while backlog or in_flight:
+            while backlog and in_flight < workers * 2:
+                work.put(backlog.pop())
+                in_flight += 1
+            res = results.get()
+            in_flight -= 1
+            if isinstance(res, BaseException):
+                raise res
+            files, dirs = res
+            backlog.extend(_children(dirs))
+            yield from files
+    finally:
+        for _t in threads:
+            work.put(None)
+
+
+def mirror_key(path: str | Path) -> str:
+    """
+    Manifest key of an absolute source path: drive letter first, '/'-separated.
+    """
+    p = Path(path)
+    parts = (p.drive.rstrip(":"), *p.relative_to(p.anchor).parts)
+    return "/".join(x for x in parts if x)
+
+
+class FileEntry:
+    """
+    A scanned source file as plain data: no Path objects, stat taken from the walk.
+    """
+    __slots__ = ("path", "rel", "size", "mtime_ns", "ino")
+
+    def __init__(self, path: str, rel: str, size: Optional[int], mtime_ns: Optional[int], ino: int = 0):
+        self.path = path  # absolute source path
+        self.rel = rel  # mirror path below the target root (drive letter first)
+        self.size = size  # None if the file could not be stat-ed
+        self.mtime_ns = mtime_ns
+        self.ino = ino  # 0 where the walk does not provide a file id
+
+    def __repr__(self) -> str:
+        return f"FileEntry({self.path!r}, size={self.size}, mtime_ns={self.mtime_ns})"
+
+
+def _walk_rule(root: Path, rule: PathRule, workers: int, ordered: bool,
+               unreadable: Optional[list[str]] = None) -> Iterator[os.DirEntry]:
+    matcher = ExcludeMatcher(root, rule.excludes, rule.patterns)
+    if not matcher:
+        yield from walk_files(root, workers, ordered, unreadable=unreadable)
+        return
+    for entry in walk_files(root, workers, ordered, skip_dir=matcher.skip_dir, unreadable=unreadable):
+        if not matcher.skip_file(entry.path, entry.name):
+            yield entry
+
+
+def iter_files(rule: PathRule, workers: int = SCAN_WORKERS, ordered: bool = False) -> Iterable[Path]:
     """
-    Generate all files under rule.source, excluding any paths in rule.excludes.
+    Generate all files under rule.source, excluding any paths in rule.excludes
+    and anything matching rule.patterns.
     """
     root = Path(rule.source).expanduser().resolve()
     if not root.exists():
         return
+    for entry in _walk_rule(root, rule, workers, ordered):
+        yield Path(entry.path)
 
-    excluded = [(root / Path(e)).resolve() for e in rule.excludes]
 
-    def _skip(p: Path) -> bool:
-        return any(p.is_relative_to(ex) for ex in excluded)
+def iter_entries(rule: PathRule, workers: int = SCAN_WORKERS, ordered: bool = False,
+                 unreadable: Optional[list[str]] = None) -> Iterator[FileEntry]:
+    """
+    Like iter_files, but yields FileEntry records carrying the mirror-relative
+    path and the size/mtime from DirEntry.stat() (free on Windows). Directories
+    that could not be listed are appended to unreadable.
+    """
+    root = Path(rule.source).expanduser().resolve()
+    if not root.exists():
+        return
+    root_str = str(root)
+    prefix_len = len(root_str) if root_str.endswith(os.sep) else len(root_str) + 1
+    parts = (root.drive.rstrip(":"), *root.relative_to(root.anchor).parts)
+    rel_prefix = "".join(p + os.sep for p in parts if p)
 
-    stack = [root]
-    while stack:
-        cur = stack.pop()
-        if _skip(cur):
-            continue
+    for entry in _walk_rule(root, rule, workers, ordered, unreadable):
         try:
-            with os.scandir(cur) as it:
-                for entry in it:
-                    path = Path(entry.path)
-                    if entry.is_dir(follow_symlinks=False):
-                        stack.append(path)
-                    elif entry.is_file(follow_symlinks=False) and not _skip(path):
-                        yield path
-        except (PermissionError, FileNotFoundError):
-            pass
+            st = entry.stat(follow_symlinks=False)
+            size, mtime_ns, ino = st.st_size, st.st_mtime_ns, st.st_ino
+        except OSError:
+            size = mtime_ns = None
+            ino = 0
+        yield FileEntry(entry.path, rel_prefix + entry.path[prefix_len:], size, mtime_ns, ino)
 
 
 @lru_cache(maxsize=None)
-def dir_size(path: str | Path) -> int:
+def dir_size(path: str | Path, workers: int = SCAN_WORKERS) -> int:
     """
     Однократный (lru-кэш) расчёт размера файла/каталога.
     """
@@ -123,20 +345,10 @@ def dir_size(path: str | Path) -> int:
         return 0
 
     total = 0
-    stack = [p]
-    while stack:
-        cur = stack.pop()
+    for e in walk_files(p, workers):
         try:
-            with os.scandir(cur) as it:
-                for e in it:
-                    if e.is_dir(follow_symlinks=False):
-                        stack.append(Path(e.path))
-                    elif e.is_file(follow_symlinks=False):
-                        try:
-                            total += e.stat().st_size
-                        except OSError:
-                            pass
-        except (PermissionError, FileNotFoundError):
+            total += e.stat().st_size
+        except OSError:
             pass
     return total
 
@@ -160,6 +372,19 @@ def notify_user(title: str, message: str, icon: int = 0x00000040) -> None:
     ctypes.windll.user32.MessageBoxW(None, message, title, icon | MB_TOPMOST)
 
 
+def lower_process_priority() -> None:
+    """
+    Run the rest of this process at background CPU and I/O priority, so a
+    scheduled backup yields the disk to foreground applications.
+    """
+    if sys.platform != "win32":
+        os.nice(10)
+        return
+    PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000
+    kernel32 = ctypes.windll.kernel32
+    kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), PROCESS_MODE_BACKGROUND_BEGIN)
+
+
 def is_admin() -> bool:
     if sys.platform != "win32":
         import os
@@ -0,0 +1,49 @@
+import os
+import tempfile
+from pathlib import Path
+
+# before src is imported: settings and the digest cache live under %APPDATA%,
+# and log messages are matched in English
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="backup-tool-tests-")
+os.environ["LC_ALL"] = "C"
+
+import pytest  # noqa: E402
+
+from src.config import PathRule, Settings  # noqa: E402
+from src.copier import run_backup  # noqa: E402
+from src.utils import mirror_key  # noqa: E402
+
+
+@pytest.fixture
+def src(tmp_path) -> Path:
+    path = tmp_path / "src"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def tgt(tmp_path) -> Path:
+    return tmp_path / "tgt"
+
+
+@pytest.fixture
+def backup(src, tgt):
+    """
+    Run a backup of src into tgt with the given Settings fields; returns the log, summary last.
+    """
+    def _backup(use_hash: bool = False, **options) -> list[str]:
+        log: list[str] = []
+        cfg = Settings(target_dir=str(tgt), sources=[PathRule(str(src))], **options)
+        assert run_backup(cfg, lambda done, total: None, log.append, use_hash=use_hash)
+        return log
+    return _backup
+
+
+@pytest.fixture
+def mirrored(src, tgt):
+    """
+    Path of a source file (relative to src) in a mirror rooted at tgt or at the given root.
+    """
+    def _mirrored(name: str, root: Path = None) -> Path:
+        return (root or tgt) / mirror_key(src / name)
+    return _mirrored
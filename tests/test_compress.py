@@ -0,0 +1,34 @@
+import os
+
+from src.compress import COMPRESSED_SUFFIX, extract_tree
+
+
+def test_compressed_files_round_trip(src, tgt, backup, mirrored, tmp_path):
+    text = b"all work and no play makes jack a dull boy\n" * 2000
+    noise = os.urandom(64 * 1024)
+    (src / "notes.txt").write_bytes(text)
+    (src / "photos.zip").write_bytes(noise)
+
+    summary = backup(use_hash=True, compression="zlib")[-1]
+    assert "zlib 1" in summary
+    assert "Compressed: 83.98 KB →" in summary
+    stored = mirrored("notes.txt").with_name("notes.txt" + COMPRESSED_SUFFIX)
+    assert stored.stat().st_size < len(text) // 10
+    assert not mirrored("notes.txt").exists()
+    assert mirrored("photos.zip").read_bytes() == noise
+
+    # the digest taken while compressing stands in for the unreadable target copy
+    assert "Unchanged: 2" in backup(use_hash=True, compression="zlib")[-1]
+
+    assert extract_tree(tgt, tmp_path / "out") == 1
+    assert (tmp_path / "out" / mirrored("notes.txt").relative_to(tgt)).read_bytes() == text
+
+
+def test_turning_compression_off_stores_files_plainly(src, backup, mirrored):
+    (src / "notes.txt").write_text("compress me " * 1000)
+    backup(compression="zlib")
+    os.utime(src / "notes.txt")
+
+    assert "Copied: 1" in backup()[-1]
+    assert mirrored("notes.txt").read_text() == "compress me " * 1000
+    assert not mirrored("notes.txt").with_name("notes.txt" + COMPRESSED_SUFFIX).exists()
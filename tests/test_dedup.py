@@ -0,0 +1,46 @@
+import os
+
+from src.dedup import STORE_DIR
+
+KiB = 1024
+
+
+def _blobs(tgt) -> list[str]:
+    return sorted(name for _dir, _dirs, files in os.walk(tgt / STORE_DIR) for name in files)
+
+
+def _write(path, data: bytes, mtime: int) -> None:
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_blobs_are_released_with_their_last_link(src, tgt, backup, mirrored):
+    shared = os.urandom(64 * KiB)
+    _write(src / "a.bin", shared, 1_000_000)
+    _write(src / "b.bin", shared, 1_000_000)
+    backup(dedup=True, small_file_workers=1)
+    assert len(_blobs(tgt)) == 1
+    assert os.stat(mirrored("a.bin")).st_nlink == 3
+
+    _write(src / "a.bin", os.urandom(64 * KiB), 1_000_010)
+    backup(dedup=True, small_file_workers=1)
+    assert len(_blobs(tgt)) == 2  # b.bin still links the shared content
+    assert mirrored("b.bin").read_bytes() == shared
+
+    _write(src / "b.bin", os.urandom(64 * KiB), 1_000_010)
+    backup(dedup=True, small_file_workers=1)
+    assert len(_blobs(tgt)) == 2
+
+    (src / "a.bin").unlink()
+    assert "Deleted: 1" in backup(dedup=True, mirror_sync=True, max_delete_fraction=1.0)[-1]
+    assert len(_blobs(tgt)) == 1
+    assert os.stat(mirrored("b.bin")).st_nlink == 2
+
+
+def test_small_files_are_not_deduplicated(src, tgt, backup, mirrored):
+    (src / "a.txt").write_text("same")
+    (src / "b.txt").write_text("same")
+
+    backup(dedup=True)
+    assert _blobs(tgt) == []
+    assert os.stat(mirrored("a.txt")).st_nlink == 1
@@ -0,0 +1,34 @@
+import os
+
+from src.delta import DELTA_CHUNK_SIZE
+
+MiB = 1024 * 1024
+
+
+def _write(path, data: bytes, mtime: int) -> None:
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_delta_copy_rewrites_only_changed_chunks(src, backup, mirrored):
+    data = bytearray(os.urandom(8 * DELTA_CHUNK_SIZE))
+    _write(src / "big.bin", bytes(data), 1_000_000)
+    assert "8.00 MB scanned, 8.00 MB copied" in backup(delta_threshold=MiB)[-1]
+
+    data[3 * DELTA_CHUNK_SIZE + 10:3 * DELTA_CHUNK_SIZE + 20] = os.urandom(10)
+    _write(src / "big.bin", bytes(data), 1_000_010)
+    summary = backup(delta_threshold=MiB)[-1]
+    assert "Engine: delta 1" in summary
+    assert "8.00 MB scanned, 1.00 MB copied" in summary
+    assert mirrored("big.bin").read_bytes() == data
+
+
+def test_dedup_hits_copy_no_bytes(src, backup):
+    data = os.urandom(MiB)
+    (src / "a.bin").write_bytes(data)
+    (src / "b.bin").write_bytes(data)
+
+    # one worker, so the second file finds the blob the first one stored
+    summary = backup(use_hash=True, dedup=True, small_file_workers=1)[-1]
+    assert "Engine: dedup 1, dedup-store 1" in summary
+    assert "2.00 MB scanned, 1.00 MB copied" in summary
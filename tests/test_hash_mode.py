@@ -0,0 +1,30 @@
+import os
+
+MiB = 1024 * 1024
+
+
+def _write(path, data: bytes, mtime: int) -> None:
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_sampled_file_with_matching_metadata_is_unchanged(src, backup):
+    _write(src / "big.bin", os.urandom(8 * MiB), 1_000_000)
+    backup(use_hash=True, sample_threshold=MiB)  # copies
+    backup(use_hash=True, sample_threshold=MiB)  # records digest and sample
+
+    assert "Unchanged: 1" in backup(use_hash=True, sample_threshold=MiB)[-1]
+
+
+def test_sampled_file_with_new_mtime_gets_a_full_digest(src, backup, mirrored):
+    data = bytearray(os.urandom(8 * MiB))
+    _write(src / "big.bin", bytes(data), 1_000_000)
+    backup(use_hash=True, sample_threshold=MiB)
+    backup(use_hash=True, sample_threshold=MiB)
+
+    # between two of the sampled blocks, so the sample still matches
+    data[4 * MiB:4 * MiB + 4096] = os.urandom(4096)
+    _write(src / "big.bin", bytes(data), 1_000_010)
+    assert "Copied: 1" in backup(use_hash=True, sample_threshold=MiB)[-1]
+    assert mirrored("big.bin").read_bytes() == data
+    assert "Unchanged: 1" in backup()[-1]
@@ -0,0 +1,123 @@
+from pathlib import Path
+
+from src import utils
+from src.config import PathRule, Settings
+from src.copier import run_backup
+from src.manifest import Manifest
+from src.mirror import sorted_orphans, split_case_aliases, target_keys
+from src.utils import mirror_key
+
+
+def _tree(root: Path, names) -> None:
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+
+
+def _backup(src: Path, tgt: Path, *sources: Path, **options) -> None:
+    cfg = Settings(target_dir=str(tgt), sources=[PathRule(str(s)) for s in (src, *sources)],
+                   mirror_sync=True, **options)
+    assert run_backup(cfg, lambda done, total: None, lambda msg: None)
+
+
+def _mirrored(tgt: Path, src: Path, name: str) -> Path:
+    return tgt / mirror_key(src / name)
+
+
+def test_sorted_orphans():
+    target = ["a", "b/c", "b/d", "e", "f"]
+    source = ["a", "b/d", "c", "f", "g"]
+    assert list(sorted_orphans(target, source)) == ["b/c", "e"]
+    assert list(sorted_orphans(target, [])) == target
+    assert list(sorted_orphans([], source)) == []
+
+
+def test_target_keys_maps_compressed_names_and_skips_own_stores(tmp_path):
+    _tree(tmp_path, ["a.txt", "d/b.txt.bkz", "d/e/c.bin", ".backup_pack/00001.seg", "snapshots/x/y.txt"])
+    (tmp_path / ".backup_manifest.sqlite").write_bytes(b"")
+    keys = target_keys(tmp_path, (".backup_manifest.sqlite", ".backup_pack", "snapshots"), workers=2)
+    assert keys == ["a.txt", "d/b.txt", "d/e/c.bin"]
+
+
+def test_deletes_files_removed_from_source(tmp_path):
+    src, tgt = tmp_path / "src", tmp_path / "tgt"
+    _tree(src, ["keep.txt", "gone/old.txt"])
+    _backup(src, tgt, max_delete_fraction=1.0)
+    assert _mirrored(tgt, src, "gone/old.txt").exists()
+
+    (src / "gone" / "old.txt").unlink()
+    (src / "gone").rmdir()
+    _backup(src, tgt, max_delete_fraction=1.0)
+    assert not _mirrored(tgt, src, "gone").exists()
+    assert _mirrored(tgt, src, "keep.txt").exists()
+
+
+def test_delete_fraction_cap(tmp_path):
+    src, tgt = tmp_path / "src", tmp_path / "tgt"
+    names = [f"f{i}.txt" for i in range(10)]
+    _tree(src, names)
+    _backup(src, tgt)
+    for name in names[:5]:
+        (src / name).unlink()
+
+    _backup(src, tgt, max_delete_fraction=0.2)
+    assert all(_mirrored(tgt, src, name).exists() for name in names)
+
+    _backup(src, tgt, max_delete_fraction=0.5)
+    assert not any(_mirrored(tgt, src, name).exists() for name in names[:5])
+
+
+def test_skipped_when_a_source_is_missing(tmp_path):
+    src, other, tgt = tmp_path / "src", tmp_path / "other", tmp_path / "tgt"
+    _tree(src, ["a.txt", "b.txt"])
+    _tree(other, ["c.txt"])
+    _backup(src, tgt, other, max_delete_fraction=1.0)
+    (other / "c.txt").unlink()
+    other.rmdir()
+    (src / "b.txt").unlink()
+
+    _backup(src, tgt, other, max_delete_fraction=1.0)
+    assert _mirrored(tgt, src, "b.txt").exists()
+    assert _mirrored(tgt, other, "c.txt").exists()
+
+
+def test_unreadable_directories_are_protected(tmp_path, monkeypatch):
+    src, tgt = tmp_path / "src", tmp_path / "tgt"
+    _tree(src, ["a.txt", "locked/b.txt", "locked/sub/c.txt"])
+    _backup(src, tgt, max_delete_fraction=1.0)
+    (src / "a.txt").unlink()
+
+    list_dir = utils._list_dir
+    locked = str(src / "locked")
+
+    def _list_dir(path, unreadable=None):
+        if path == locked:
+            unreadable.append(path)
+            return [], []
+        return list_dir(path, unreadable)
+
+    monkeypatch.setattr(utils, "_list_dir", _list_dir)
+    _backup(src, tgt, max_delete_fraction=1.0)
+    assert not _mirrored(tgt, src, "a.txt").exists()
+    assert _mirrored(tgt, src, "locked/b.txt").exists()
+    assert _mirrored(tgt, src, "locked/sub/c.txt").exists()
+
+
+def test_case_aliases(monkeypatch):
+    monkeypatch.setattr("src.mirror.fold_key", str.lower)
+    orphans = ["a/Foo/x", "a/gone", "b/Y"]
+    assert split_case_aliases(orphans, ["a/foo/x", "b/y", "c"]) == (["a/gone"], ["a/Foo/x", "b/Y"])
+
+
+def test_case_only_rename_keeps_the_file_on_case_insensitive_targets(tmp_path, monkeypatch):
+    src, tgt = tmp_path / "src", tmp_path / "tgt"
+    _tree(src, ["Foo/x.txt"])
+    _backup(src, tgt, max_delete_fraction=1.0)
+    (src / "Foo").rename(src / "foo")
+
+    # this filesystem is case-sensitive; pretend it isn't, as on Windows
+    monkeypatch.setattr("src.mirror.fold_key", str.lower)
+    _backup(src, tgt, max_delete_fraction=1.0)
+    assert _mirrored(tgt, src, "Foo/x.txt").exists()
+    assert Manifest.load(tgt).keys() == [mirror_key(src / "foo/x.txt")]
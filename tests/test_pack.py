@@ -0,0 +1,44 @@
+from src.pack import PACK_DIR, extract
+from src.utils import mirror_key as mirrored_key
+
+
+def test_files_lost_by_a_failed_index_commit_are_packed_again(src, tgt, backup, tmp_path):
+    for i in range(3):
+        (src / f"small{i}.txt").write_text(f"file {i}")
+    index = tgt / PACK_DIR / "index.sqlite"
+    index.mkdir(parents=True)  # sqlite can't open it
+
+    log = backup(pack_small_files=True)
+    assert any("Could not update pack index" in line for line in log)
+
+    index.rmdir()
+    assert "Copied: 3" in backup(pack_small_files=True)[-1]
+    assert extract(tgt, tmp_path / "out") == 3
+
+
+def test_packed_files_leave_no_mirror_directories(src, tgt, backup, mirrored):
+    (src / "sub").mkdir()
+    (src / "sub" / "small.txt").write_text("small")
+
+    assert "Copied: 1" in backup(pack_small_files=True)[-1]
+    assert not mirrored("sub").exists()
+    assert not mirrored(".").exists()
+
+
+def test_pack_is_compacted_once_most_of_it_is_dead(src, tgt, backup, tmp_path):
+    for i in range(4):
+        (src / f"small{i}.txt").write_text(f"old {i}" * 100)
+    backup(pack_small_files=True)
+
+    for version in ("mid", "new"):  # 3 of 4 files twice: 60% of the pack is dead after that
+        for i in range(3):
+            (src / f"small{i}.txt").write_text(f"{version} {i}" * 100)
+        log = backup(pack_small_files=True)
+    assert any("Compacted the pack" in line for line in log)
+    assert [seg.stat().st_size for seg in (tgt / PACK_DIR).glob("*.seg")] == [4 * 500]
+
+    assert extract(tgt, tmp_path / "out") == 4
+    for i in range(4):
+        expected = (f"new {i}" if i < 3 else f"old {i}") * 100
+        assert (tmp_path / "out" / mirrored_key(src / f"small{i}.txt")).read_text() == expected
+    assert "Unchanged: 4" in backup(pack_small_files=True)[-1]
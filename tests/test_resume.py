@@ -0,0 +1,38 @@
+import os
+
+from src.fastcopy import PARTIAL_SUFFIX
+
+MiB = 1024 * 1024
+
+
+def _partial(dst, src_file) -> str:
+    st = src_file.stat()
+    return f"{dst}.{st.st_size:x}-{st.st_mtime_ns:x}{PARTIAL_SUFFIX}"
+
+
+def test_interrupted_copy_is_resumed_and_stale_partials_removed(src, backup, mirrored):
+    data = os.urandom(4 * MiB)
+    (src / "big.bin").write_bytes(data)
+    dst = mirrored("big.bin")
+    dst.parent.mkdir(parents=True)
+    with open(_partial(dst, src / "big.bin"), "wb") as f:  # left by an interrupted run
+        f.write(data[:MiB + 123])
+    stale = f"{dst}.{1234:x}-{5678:x}{PARTIAL_SUFFIX}"  # an older version of the source
+    with open(stale, "wb") as f:
+        f.write(b"old")
+
+    assert "Engine: resumed 1" in backup(large_file_threshold=MiB)[-1]
+    assert dst.read_bytes() == data
+    assert list(dst.parent.glob("*" + PARTIAL_SUFFIX)) == []
+
+
+def test_partial_that_does_not_match_the_source_is_rewritten(src, backup, mirrored):
+    data = os.urandom(4 * MiB)
+    (src / "big.bin").write_bytes(data)
+    dst = mirrored("big.bin")
+    dst.parent.mkdir(parents=True)
+    with open(_partial(dst, src / "big.bin"), "wb") as f:
+        f.write(os.urandom(MiB))
+
+    assert "Engine: resumed" not in backup(large_file_threshold=MiB)[-1]
+    assert dst.read_bytes() == data
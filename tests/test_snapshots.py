@@ -0,0 +1,51 @@
+import os
+from datetime import datetime
+
+from src.snapshots import SNAPSHOT_DIR, list_snapshots, new_snapshot
+from src.utils import mirror_key
+
+
+def _snapshots(tgt) -> list:
+    return [path for _ts, path in list_snapshots(tgt)]
+
+
+def test_unchanged_files_are_linked_to_the_previous_snapshot(src, tgt, backup):
+    (src / "kept.txt").write_text("kept")
+    (src / "changed.txt").write_text("v1")
+    backup(snapshots=True)
+
+    (src / "changed.txt").write_text("version 2")
+    summary = backup(snapshots=True)[-1]
+    assert "Copied: 1 | Unchanged: 1" in summary
+
+    first, second = _snapshots(tgt)
+    kept = mirror_key(src / "kept.txt")
+    changed = mirror_key(src / "changed.txt")
+    assert os.path.samefile(first / kept, second / kept)
+    assert os.stat(second / kept).st_nlink == 2
+    assert (first / changed).read_text() == "v1"
+    assert (second / changed).read_text() == "version 2"
+
+
+def test_snapshots_taken_within_one_second_get_their_own_directory(tgt):
+    now = datetime(2024, 5, 1, 12, 0, 0)
+    first, previous = new_snapshot(tgt, now)
+    second, previous_of_second = new_snapshot(tgt, now)
+
+    assert previous is None and previous_of_second == first
+    assert second.name == first.name + ".2"
+    assert _snapshots(tgt) == [first, second]
+
+
+def test_old_snapshots_are_pruned(src, tgt, backup):
+    (src / "a.txt").write_text("a")
+    old = [tgt / SNAPSHOT_DIR / name for name in ("2020-01-01_120000", "2020-01-02_120000")]
+    for path in old:
+        path.mkdir(parents=True)
+        (path / "stale.txt").write_text("stale")
+
+    log = backup(snapshots=True, keep_daily=1, keep_weekly=1)
+    assert any("Removed 2 old snapshots" in line for line in log)
+    assert not any(path.exists() for path in old)
+    [latest] = _snapshots(tgt)
+    assert (latest / mirror_key(src / "a.txt")).read_text() == "a"
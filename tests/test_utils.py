@@ -0,0 +1,15 @@
+import os
+
+from src.utils import walk_files
+
+
+def test_walk_files_ordered(tmp_path):
+    for name in ["b.txt", "a/z.txt", "a/b/y.txt", "c/x.txt", "a.txt"]:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+
+    ordered = [e.path[len(str(tmp_path)) + 1:] for e in walk_files(tmp_path, workers=4, ordered=True)]
+    expected = ["a.txt", "b.txt", "a/z.txt", "a/b/y.txt", "c/x.txt"]
+    assert ordered == [n.replace("/", os.sep) for n in expected]
+    assert sorted(e.path for e in walk_files(tmp_path, workers=4)) == sorted(str(tmp_path / n) for n in ordered)